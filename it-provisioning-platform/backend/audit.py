@@ -0,0 +1,124 @@
+"""
+Batched Audit Log Writer
+
+Audit events are buffered in memory and written to the audit_log table in
+batches, either once AUDIT_FLUSH_SIZE events are pending or every
+AUDIT_FLUSH_INTERVAL_SECONDS, whichever comes first. This keeps the commit
+(and fsync) for an audit event off the request's write path.
+
+Callers that need the event to commit atomically with their own changes
+use strict mode (crud.create_audit_log(..., strict=True)), which adds the
+row to their transaction instead of the buffer.
+
+Pending events are flushed on application shutdown and at interpreter exit.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import insert
+
+import metrics
+import models
+from database import SessionLocal
+
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "100"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+
+logger = logging.getLogger(__name__)
+
+
+class AuditSink:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        flush_size: int = AUDIT_FLUSH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval
+        self._buffer: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Only one batch is written at a time
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def record(self, *, actor_id: int, event_type: str, details: dict):
+        """Buffer an audit event, it is written by the next flush."""
+        event = {
+            "actor_id": actor_id,
+            "event_type": event_type,
+            "details": details,
+            # Stamp the event now rather than when the batch reaches the database
+            "timestamp": datetime.now(timezone.utc),
+        }
+        with self._lock:
+            self._buffer.append(event)
+            pending = len(self._buffer)
+        metrics.counter("audit_events_buffered").inc()
+
+        if self._closed:
+            self.flush()
+            return
+        self._ensure_started()
+        if pending >= self._flush_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write every buffered event in one transaction, returning how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                with self._session_factory() as db:
+                    db.execute(insert(models.AuditLog), batch)
+                    db.commit()
+            except Exception:
+                # Keep the events for the next attempt, ahead of anything recorded meanwhile
+                with self._lock:
+                    self._buffer[:0] = batch
+                metrics.counter("audit_flush_failures").inc()
+                logger.exception("Failed to flush %d audit events", len(batch))
+                return 0
+
+            metrics.histogram("audit_flush_seconds").observe(time.perf_counter() - started)
+            metrics.counter("audit_events_flushed").inc(len(batch))
+            return len(batch)
+
+    def close(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Global audit sink instance
+audit_sink = AuditSink()
+atexit.register(audit_sink.close)
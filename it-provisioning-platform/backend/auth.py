@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException, Header
 from sqlalchemy.orm import Session
 import models, database
+from identity_cache import identity_cache
 
 def get_current_user(
     user_id: int | None = Header(None, alias="user-id"), 
@@ -9,7 +10,7 @@ def get_current_user(
     """Get current user from user_id header. Returns None for unlogged users."""
     if user_id is None:
         return None  # Unlogged user
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = identity_cache.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid user ID")
     return user
@@ -0,0 +1,69 @@
+"""
+Write-path latency of PUT /requests/{id}/status with the audit event
+committed on its own versus handed to the batched audit sink.
+
+"commit per event" is how audit rows were written before audit.py: the
+event is added to the session and committed straight away, a second commit
+on every status change. "buffered" is the current default.
+
+    BENCH_DATABASE_URL=... python -m bench.audit_writes --changes 2000
+"""
+
+import argparse
+import random
+
+from bench import common
+
+from sqlalchemy import func, select
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--changes", type=int, default=2000, help="status changes timed per variant")
+    parser.add_argument("--requests", type=int, default=10_000)
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from fastapi.testclient import TestClient
+
+    import audit
+    import crud
+    import main
+    import models
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        request_ids = common.seed(db, requests=args.requests, mailboxes=0)["requests"]
+
+    buffered = crud.create_audit_log
+
+    def commit_per_event(db, **kwargs):
+        entry = buffered(db, strict=True, **kwargs)
+        db.commit()
+        return entry
+
+    rng = random.Random(0)
+    rows = []
+    with TestClient(main.app) as client:
+        for name, create_audit_log in (("commit per event", commit_per_event), ("buffered", buffered)):
+            crud.create_audit_log = create_audit_log
+
+            def change_status():
+                response = client.put(f"/requests/{rng.choice(request_ids)}/status", params={"status": rng.choice(common.STATUSES)})
+                response.raise_for_status()
+
+            samples = common.time_calls(change_status, args.changes, warmup=20)
+            audit.audit_sink.flush()
+            stats = common.summarize(samples)
+            rows.append([name, f"{stats['mean']:.2f}", f"{stats['p50']:.2f}", f"{stats['p95']:.2f}", f"{stats['p99']:.2f}", f"{len(samples) / sum(samples):.0f}"])
+        crud.create_audit_log = buffered
+
+    with SessionLocal() as db:
+        written = db.scalar(select(func.count()).select_from(models.AuditLog).where(models.AuditLog.event_type == "REQUEST_STATUS_CHANGED"))
+
+    print(f"\n{args.changes} status changes per variant, one client, {written} audit rows written in total")
+    common.print_table(["audit write", "mean ms", "p50 ms", "p95 ms", "p99 ms", "changes/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Concurrent temp account claims (crud.claim_temp_account) with the
+table_versions triggers installed.
+
+Each thread claims free accounts in a loop and keeps its transaction open
+for --hold-ms before committing, standing in for the request update and
+audit done alongside the claim. FOR UPDATE SKIP LOCKED keeps claims off each
+other's account rows; any lock wait left is on the table_versions row the
+statement trigger bumps. A sampler polls pg_stat_activity for claims
+waiting on a lock, which tells those waits apart from CPU queueing. Compared with the triggers dropped, with one counter row per table, and
+with the sharded counters.
+
+    BENCH_DATABASE_URL=... python -m bench.claim_contention --threads 1 8 32 --seconds 5
+"""
+
+import argparse
+import threading
+import time
+
+from bench import common
+from bench.version_triggers import install
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+
+SAMPLE_SECONDS = 0.005
+
+LOCK_WAITERS = text("""
+    SELECT count(*) FROM pg_stat_activity
+    WHERE wait_event_type = 'Lock' AND query LIKE 'UPDATE temp_accounts%'
+""")
+
+
+def run(engine, threads: int, seconds: float, hold: float) -> dict:
+    import crud
+    import models
+
+    claims: list[list[float]] = [[] for _ in range(threads)]
+    claimed: list[list[int]] = [[] for _ in range(threads)]
+    exhausted = threading.Event()
+    waiters: list[int] = []
+    deadline = time.perf_counter() + seconds
+
+    def worker(index: int):
+        with Session(engine) as db:
+            while time.perf_counter() < deadline and not exhausted.is_set():
+                started = time.perf_counter()
+                account = crud.claim_temp_account(db)
+                claims[index].append(time.perf_counter() - started)
+                if account is None:
+                    exhausted.set()
+                    db.rollback()
+                    break
+                claimed[index].append(account.id)
+                time.sleep(hold)
+                db.commit()
+
+    def sampler():
+        with engine.connect() as connection:
+            while time.perf_counter() < deadline and not exhausted.is_set():
+                waiters.append(connection.scalar(LOCK_WAITERS))
+                connection.commit()
+                time.sleep(SAMPLE_SECONDS)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    workers.append(threading.Thread(target=sampler))
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ids = [account_id for thread_ids in claimed for account_id in thread_ids]
+    with Session(engine) as db:
+        in_use = db.scalar(select(func.count()).select_from(models.TempAccount).where(models.TempAccount.is_in_use))
+        db.execute(update(models.TempAccount).values(is_in_use=False))
+        db.commit()
+    if exhausted.is_set():
+        raise SystemExit("Ran out of free temp accounts, seed more with --accounts")
+    if len(set(ids)) != len(ids) or in_use != len(ids):
+        raise SystemExit(f"{len(ids)} claims returned {len(set(ids))} distinct accounts, {in_use} marked in use")
+
+    flat = [sample for thread_samples in claims for sample in thread_samples]
+    return {
+        "claims_per_second": len(ids) / elapsed,
+        "waiting": sum(waiters) / len(waiters),
+        "any_waiting": sum(count > 0 for count in waiters) / len(waiters),
+        **common.summarize(flat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=10, help="time each claim's transaction stays open")
+    parser.add_argument("--accounts", type=int, default=50_000)
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from sqlalchemy import create_engine
+
+    import main  # noqa: F401, creates the tables and triggers
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        common.seed(db, managers=1, requests=0, mailboxes=0, temp_accounts=args.accounts)
+    engine = create_engine(common.BENCH_DATABASE_URL, pool_size=max(args.threads) + 2)
+
+    rows = []
+    for variant in ("no triggers", "single row", "sharded"):
+        install(engine, variant)
+        for threads in args.threads:
+            result = run(engine, threads, args.seconds, args.hold_ms / 1000)
+            rows.append([
+                variant,
+                threads,
+                f"{result['claims_per_second']:.0f}",
+                f"{result['waiting']:.2f}",
+                f"{result['any_waiting']:.0%}",
+                f"{result['p50']:.2f}",
+                f"{result['p95']:.2f}",
+                f"{result['max']:.2f}",
+            ])
+
+    print(f"\n{args.seconds:g}s per run, transactions held {args.hold_ms:g}ms, all claimed accounts distinct")
+    print("claim times are the claim statement alone; lock waiters are sampled claims blocked on a lock, on average and how often any was")
+    common.print_table(["triggers", "threads", "claims/s", "lock waiters", "any waiting", "p50 ms", "p95 ms", "max ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
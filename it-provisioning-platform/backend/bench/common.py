@@ -0,0 +1,178 @@
+"""
+Benchmark Helpers
+
+The scripts in this package measure the optimizations made to the backend,
+most of them against a real PostgreSQL database. Run them from backend/:
+
+    BENCH_DATABASE_URL=postgresql://... python -m bench.<name> [options]
+
+BENCH_DATABASE_URL becomes the app's DATABASE_URL. Scripts that use the
+database drop its public schema and re-seed it on every run, so point it at
+a throwaway database. Import this module before any app module, since those read their settings
+at import time.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import create_engine, insert, text
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if BENCH_DATABASE_URL:
+    os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+SERVICES = ["IT", "HR", "Finance", "Sales", "Legal", "Operations", "Support", "Marketing"]
+STATUSES = ["pending", "in_progress", "completed", "rejected"]
+
+
+def reset_schema(url: str | None = BENCH_DATABASE_URL):
+    """Drop and recreate the public schema, the app recreates its tables when main is imported."""
+    if not url:
+        sys.exit("Set BENCH_DATABASE_URL to a throwaway PostgreSQL database (its schema is dropped).")
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+    engine.dispose()
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Mean and percentiles, in milliseconds, of durations given in seconds."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def time_calls(fn: Callable[[], object], repeat: int, warmup: int = 1) -> list[float]:
+    """Durations in seconds of repeat calls to fn, after warmup untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def format_stats(stats: dict[str, float]) -> str:
+    return "n={n:<6} mean={mean:8.2f}ms p50={p50:8.2f}ms p95={p95:8.2f}ms p99={p99:8.2f}ms max={max:8.2f}ms".format(**stats)
+
+
+def print_table(headers: list[str], rows: list[list]):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers, ["-" * width for width in widths], *rows]:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+def seed(
+    db,
+    managers: int = 50,
+    requests: int = 10_000,
+    mailboxes: int = 500,
+    mailboxes_per_manager: int = 20,
+    temp_accounts: int = 100,
+    audit_events: int = 0,
+    form_fields: int = 8,
+    days: int = 90,
+    seed: int = 1,
+) -> dict[str, list[int]]:
+    """
+    Insert a realistic data set with bulk INSERTs and rebuild the rollups.
+
+    One admin comes first (id 1), followed by the managers spread over
+    SERVICES. Returns the ids of what was created, by kind.
+    """
+    import models
+    import rollups
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    db.execute(insert(models.User), [{"full_name": "Bench Admin", "email": "admin@example.com", "role": models.UserRole.admin}] + [
+        {"full_name": f"Manager {i}", "email": f"manager{i}@example.com", "role": models.UserRole.manager, "service": SERVICES[i % len(SERVICES)]}
+        for i in range(managers)
+    ])
+    manager_ids = list(range(2, managers + 2))
+
+    db.execute(insert(models.FormDefinition), [
+        {"name": f"Form {i}", "description": f"Benchmark form {i}", "created_by_admin_id": 1,
+         "schema": {"fields": [{"name": f"field{j}", "type": "text", "label": f"Field {j}"} for j in range(form_fields)]}}
+        for i in range(5)
+    ])
+    form_ids = list(range(1, 6))
+
+    batch = []
+    for i in range(requests):
+        batch.append({
+            "status": models.RequestStatus(rng.choice(STATUSES)),
+            "form_definition_id": rng.choice(form_ids),
+            "submitted_by_manager_id": rng.choice(manager_ids),
+            "timestamp": now - timedelta(days=rng.random() * days),
+            "form_data": {"department": rng.choice(SERVICES), "employee": f"Employee {i}", "notes": "x" * rng.randint(20, 400)},
+        })
+        if len(batch) == 5000:
+            db.execute(insert(models.Request), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Request), batch)
+
+    db.execute(insert(models.SharedMailbox), [
+        {"display_name": f"Mailbox {i}", "primary_smtp_address": f"mailbox{i}@example.com"}
+        for i in range(mailboxes)
+    ])
+    mailbox_ids = list(range(1, mailboxes + 1))
+    if mailboxes and mailboxes_per_manager:
+        db.execute(insert(models.manager_mailbox_association), [
+            {"manager_id": manager_id, "mailbox_id": mailbox_id}
+            for manager_id in manager_ids
+            for mailbox_id in rng.sample(mailbox_ids, min(mailboxes_per_manager, mailboxes))
+        ])
+
+    if temp_accounts:
+        db.execute(insert(models.TempAccount), [
+            {"user_principal_name": f"temp{i}@example.com", "display_name": f"Temp {i}", "is_in_use": False}
+            for i in range(temp_accounts)
+        ])
+
+    batch = []
+    for i in range(audit_events):
+        request_id = rng.randint(1, max(requests, 1))
+        from_status, to_status = rng.sample(STATUSES, 2)
+        batch.append({
+            "actor_id": 1,
+            "event_type": rng.choice(("REQUEST_STATUS_CHANGED", "REQUEST_STATUS_CHANGED", "TEMP_ACCOUNT_STATUS_CHANGED", "TEMP_ACCOUNT_ASSIGNED")),
+            "timestamp": now - timedelta(days=rng.random() * days),
+            "details": {"request_id": request_id, "from_status": from_status, "to_status": to_status},
+        })
+        if len(batch) == 5000:
+            db.execute(insert(models.AuditLog), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.AuditLog), batch)
+
+    rollups.rebuild(db)
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return {
+        "managers": manager_ids,
+        "forms": form_ids,
+        "requests": list(range(1, requests + 1)),
+        "mailboxes": mailbox_ids,
+        "temp_accounts": list(range(1, temp_accounts + 1)),
+    }
@@ -0,0 +1,140 @@
+"""
+Query plans and latency of the hot queries with and without the indexes of
+migration 0002_hot_path_indexes.
+
+Seeds the database, then for each query prints EXPLAIN (ANALYZE, BUFFERS)
+and times repeated executions twice: with the indexes, and with them
+dropped inside a transaction that is rolled back afterwards.
+
+    BENCH_DATABASE_URL=... python -m bench.indexes --requests 200000 --audit-events 200000
+"""
+
+import argparse
+import json
+
+from bench import common
+
+from sqlalchemy import text
+
+# The indexes under test, all from migration 0002
+INDEXES = [
+    "ix_users_role",
+    "ix_requests_submitted_by_timestamp",
+    "ix_requests_status_timestamp",
+    "ix_requests_form_definition_id",
+    "ix_requests_form_data_gin",
+    "ix_audit_log_event_type_timestamp",
+    "ix_audit_log_actor_id",
+    "ix_audit_log_details_gin",
+]
+
+# (name, SQL, parameters), mirroring the statements built in crud.py and identity_cache.py
+QUERIES = [
+    (
+        "manager listing",
+        "SELECT * FROM requests WHERE submitted_by_manager_id = :manager_id "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100",
+        {"manager_id": 7},
+    ),
+    (
+        "service listing",
+        "SELECT requests.* FROM requests JOIN users ON requests.submitted_by_manager_id = users.id "
+        "WHERE users.service = :service ORDER BY requests.timestamp DESC, requests.id DESC LIMIT 100",
+        {"service": "Finance"},
+    ),
+    (
+        "first manager",
+        "SELECT id FROM users WHERE role = 'manager' ORDER BY id LIMIT 1",
+        {},
+    ),
+    (
+        "status queue",
+        "SELECT * FROM requests WHERE status = 'pending' ORDER BY timestamp DESC LIMIT 100",
+        {},
+    ),
+    (
+        "status breakdown, last 7 days",
+        "SELECT status, count(*) FROM requests WHERE timestamp >= now() - interval '7 days' "
+        "AND status IN ('pending', 'in_progress') GROUP BY status",
+        {},
+    ),
+    (
+        "form breakdown",
+        "SELECT count(*) FROM requests WHERE form_definition_id = :form_id",
+        {"form_id": 3},
+    ),
+    (
+        "form_data containment",
+        "SELECT * FROM requests WHERE form_data @> CAST(:document AS jsonb) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 100",
+        {"document": json.dumps({"employee": "Employee 4242"})},
+    ),
+    (
+        "audit log by event type",
+        "SELECT * FROM audit_log WHERE event_type = 'TEMP_ACCOUNT_ASSIGNED' ORDER BY timestamp DESC LIMIT 100",
+        {},
+    ),
+    (
+        "audit details containment",
+        "SELECT * FROM audit_log WHERE details @> CAST(:document AS jsonb) ORDER BY timestamp DESC, id DESC LIMIT 100",
+        {"document": json.dumps({"request_id": 4242})},
+    ),
+]
+
+
+def measure(connection, sql: str, params: dict, repeat: int) -> tuple[str, dict]:
+    plan = connection.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), params).scalars().all()
+    samples = common.time_calls(lambda: connection.execute(text(sql), params).all(), repeat)
+    return "\n".join(plan), common.summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--audit-events", type=int, default=200_000)
+    parser.add_argument("--managers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--quiet", action="store_true", help="only print the latency table, not the plans")
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from database import SessionLocal, engine
+    import main  # noqa: F401, creates the tables and indexes
+
+    with SessionLocal() as db:
+        common.seed(db, managers=args.managers, requests=args.requests, audit_events=args.audit_events, mailboxes=0)
+
+    results = {}
+    with engine.connect() as connection:
+        for variant in ("with indexes", "without indexes"):
+            transaction = connection.begin()
+            if variant == "without indexes":
+                for name in INDEXES:
+                    connection.execute(text(f'DROP INDEX "{name}"'))
+            for name, sql, params in QUERIES:
+                plan, stats = measure(connection, sql, params, args.repeat)
+                results[name, variant] = stats
+                if not args.quiet:
+                    print(f"\n=== {name}, {variant} ===\n{plan}")
+            # Rolling back restores the dropped indexes
+            transaction.rollback()
+
+    print(f"\n{args.requests} requests, {args.audit_events} audit events, {args.managers} managers, {args.repeat} runs per query")
+    common.print_table(
+        ["query", "p50 with", "p50 without", "p95 with", "p95 without", "speedup"],
+        [
+            [
+                name,
+                f"{results[name, 'with indexes']['p50']:.2f}ms",
+                f"{results[name, 'without indexes']['p50']:.2f}ms",
+                f"{results[name, 'with indexes']['p95']:.2f}ms",
+                f"{results[name, 'without indexes']['p95']:.2f}ms",
+                f"{results[name, 'without indexes']['p50'] / results[name, 'with indexes']['p50']:.1f}x",
+            ]
+            for name, _, _ in QUERIES
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Latency and query count of POST /requests/mailbox-modifications for large
+batches, with the mailboxes validated one by one versus in a single query.
+
+"one by one" is how batches were validated before
+crud.get_mailbox_violations: a lookup per mailbox and a scan of the
+manager's lazily loaded managed_mailboxes. "one query" is the current code.
+
+    BENCH_DATABASE_URL=... python -m bench.mailbox_modifications --sizes 500,2000
+"""
+
+import argparse
+
+from bench import common
+
+from sqlalchemy import insert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="500,2000", help="comma separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed submissions per batch size and variant")
+    parser.add_argument("--mailboxes", type=int, default=5000)
+    parser.add_argument("--granted", type=int, default=4000, help="mailboxes the manager may manage")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    common.reset_schema()
+    from fastapi.testclient import TestClient
+
+    import crud
+    import main
+    import models
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        common.seed(db, managers=1, requests=0, mailboxes=0, temp_accounts=0)
+        db.execute(insert(models.SharedMailbox), [
+            {"display_name": f"Mailbox {i}", "primary_smtp_address": f"mailbox{i}@example.com"}
+            for i in range(args.mailboxes)
+        ])
+        db.execute(insert(models.manager_mailbox_association), [
+            {"manager_id": 2, "mailbox_id": mailbox_id} for mailbox_id in range(1, args.granted + 1)
+        ])
+        db.commit()
+
+    one_query = crud.get_mailbox_violations
+
+    def one_by_one(db, manager_id, mailbox_ids):
+        manager = db.get(models.User, manager_id)
+        missing, forbidden = [], []
+        for mailbox_id in mailbox_ids:
+            mailbox = db.query(models.SharedMailbox).filter(models.SharedMailbox.id == mailbox_id).first()
+            if not mailbox:
+                missing.append(mailbox_id)
+            elif mailbox not in manager.managed_mailboxes:
+                forbidden.append(mailbox.display_name)
+        return missing, forbidden
+
+    rows = []
+    with TestClient(main.app) as client:
+        for name, get_mailbox_violations in (("one by one", one_by_one), ("one query", one_query)):
+            crud.get_mailbox_violations = get_mailbox_violations
+            for size in sizes:
+                body = {"modifications": [
+                    {"mailbox_id": mailbox_id, "mailbox_name": f"Mailbox {mailbox_id - 1}", "add_users": ["someone@example.com"], "remove_users": []}
+                    for mailbox_id in range(1, size + 1)
+                ]}
+                queries = []
+
+                def submit():
+                    response = client.post("/requests/mailbox-modifications", json=body, headers={"user-id": "2"})
+                    response.raise_for_status()
+                    queries.append(int(response.headers["X-Query-Count"]))
+
+                stats = common.summarize(common.time_calls(submit, args.repeat))
+                rows.append([name, size, max(queries), f"{stats['p50']:.0f}", f"{stats['max']:.0f}"])
+        crud.get_mailbox_violations = one_query
+
+    print(f"\n{args.mailboxes} mailboxes, {args.granted} granted to the manager, {args.repeat} submissions each")
+    common.print_table(["validation", "modifications", "queries", "p50 ms", "max ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Payload size and latency of the request endpoints in their full and slim forms.
+
+The dashboard used to fetch GET /requests/{id} for every new_request event
+and now asks for ?view=summary, the row GET /requests/?view=summary lists.
+
+    BENCH_DATABASE_URL=... python -m bench.payloads --repeat 200
+"""
+
+import argparse
+import random
+
+from bench import common
+
+VARIANTS = [
+    ("detail, full", "/requests/{id}"),
+    ("detail, fields+expand", "/requests/{id}?fields=id,status,timestamp,form_definition_id&expand=submitted_by"),
+    ("detail, summary", "/requests/{id}?view=summary"),
+    ("list of 100, full", "/requests/?limit=100"),
+    ("list of 100, summary", "/requests/?limit=100&view=summary"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--form-fields", type=int, default=60, help="fields in each seeded form schema")
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        request_ids = common.seed(db, requests=args.requests, form_fields=args.form_fields, mailboxes=0)["requests"]
+
+    rng = random.Random(0)
+    rows = []
+    with TestClient(main.app) as client:
+        for name, url in VARIANTS:
+            sizes, queries = [], []
+
+            def fetch():
+                response = client.get(url.format(id=rng.choice(request_ids)))
+                response.raise_for_status()
+                sizes.append(len(response.content))
+                queries.append(int(response.headers["X-Query-Count"]))
+
+            stats = common.summarize(common.time_calls(fetch, args.repeat, warmup=5))
+            rows.append([
+                name,
+                f"{sum(sizes) / len(sizes):,.0f}",
+                f"{stats['p50']:.2f}",
+                f"{stats['p95']:.2f}",
+                max(queries),
+            ])
+
+    print(f"\n{args.requests} requests, forms with {args.form_fields} fields, {args.repeat} calls each")
+    common.print_table(["endpoint", "bytes", "p50 ms", "p95 ms", "queries"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-endpoint micro-benchmarks of response serialization (fast_json.py).
+
+For each list endpoint, the rows are loaded once and then serialized
+repeatedly two ways:
+
+- fastapi: the default path, FastAPI's serialize_response (validation,
+  jsonable_encoder) and JSONResponse's json.dumps
+- fast:    what the endpoint does now, model_response or FastJSONResponse
+
+Both outputs are checked to decode to the same JSON. The same endpoints are
+then timed end to end through the ASGI app.
+
+    BENCH_DATABASE_URL=... python -m bench.serialization --rows 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+
+from bench import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.testclient import TestClient
+    from fastapi.utils import create_response_field
+
+    import crud
+    import db_explorer
+    import main
+    import schemas
+    from database import SessionLocal
+    from fast_json import FastJSONResponse, model_response
+    from schema_cache import schema_cache
+
+    with SessionLocal() as db:
+        common.seed(db, requests=max(args.rows, 5000), audit_events=max(args.rows, 5000), mailboxes=0)
+
+    def fastapi_path(response_type):
+        field = create_response_field(name="response", type_=response_type, mode="serialization")
+
+        def render(value):
+            content = asyncio.run(serialize_response(field=field, response_content=value))
+            return JSONResponse(content).body
+        return render
+
+    def raw_fastapi_path(value):
+        from fastapi.encoders import jsonable_encoder
+        return JSONResponse(jsonable_encoder(value)).body
+
+    with SessionLocal() as db:
+        requests = crud.get_requests(db, limit=args.rows)
+        summaries = [crud.request_summary(row) for row in crud.get_request_summaries(db, limit=args.rows)]
+        audit_logs = crud.get_audit_logs(db, limit=args.rows)
+        table_rows, _ = db_explorer.fetch_rows(db, schema_cache.get_table("requests"), limit=args.rows)
+
+        cases = [
+            ("GET /requests/", requests, fastapi_path(list[schemas.Request]), lambda value: model_response(main.REQUEST_LIST, value).body),
+            ("GET /requests/?view=summary", summaries, fastapi_path(list[schemas.RequestSummary]), lambda value: model_response(main.REQUEST_SUMMARY_LIST, value).body),
+            ("GET /admin/audit-log", audit_logs, fastapi_path(list[schemas.AuditLog]), lambda value: model_response(main.AUDIT_LOG_LIST, value).body),
+            ("GET /admin/db/tables/requests", table_rows, raw_fastapi_path, lambda value: FastJSONResponse(value).body),
+        ]
+
+        rows = []
+        for name, value, slow, fast in cases:
+            if json.loads(slow(value)) != json.loads(fast(value)):
+                raise SystemExit(f"{name}: the two paths produce different JSON")
+            slow_stats = common.summarize(common.time_calls(lambda: slow(value), args.repeat))
+            fast_stats = common.summarize(common.time_calls(lambda: fast(value), args.repeat))
+            rows.append([
+                name,
+                f"{slow_stats['p50']:.2f}",
+                f"{fast_stats['p50']:.2f}",
+                f"{slow_stats['p50'] / fast_stats['p50']:.1f}x",
+                f"{len(fast(value)):,}",
+            ])
+
+    print(f"\nSerialization of {args.rows} rows, p50 over {args.repeat} runs")
+    common.print_table(["endpoint", "fastapi ms", "fast ms", "speedup", "bytes"], rows)
+
+    admin = {"user-id": "1"}
+    endpoints = [
+        f"/requests/?limit={args.rows}",
+        f"/requests/?limit={args.rows}&view=summary",
+        f"/admin/audit-log?limit={args.rows}",
+        f"/admin/db/tables/requests?limit={args.rows}",
+    ]
+    rows = []
+    with TestClient(main.app) as client:
+        for url in endpoints:
+            stats = common.summarize(common.time_calls(lambda: client.get(url, headers=admin).raise_for_status(), args.repeat))
+            rows.append([url, f"{stats['p50']:.2f}", f"{stats['p95']:.2f}"])
+
+    print(f"\nEnd to end through the app, {args.repeat} calls each")
+    common.print_table(["endpoint", "p50 ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
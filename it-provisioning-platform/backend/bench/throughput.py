@@ -0,0 +1,111 @@
+"""
+Requests per second of the async endpoints in sync and async DATABASE_MODE.
+
+Starts a uvicorn server per mode on the same seeded database and drives it
+with concurrent clients for a fixed time per scenario:
+
+- create: POST /requests/
+- status: PUT /requests/{id}/status with a random request and status
+- mixed:  the two above plus GET /requests/{id} (a sync endpoint sharing the threadpool)
+
+    BENCH_DATABASE_URL=... python -m bench.throughput --concurrency 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+from bench import common
+
+import httpx
+
+SCENARIOS = ("create", "status", "mixed")
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_MODE=mode)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn did not start in {mode} mode")
+
+
+async def run_scenario(base_url: str, scenario: str, concurrency: int, seconds: float, request_ids: list[int]) -> dict:
+    rng = random.Random(0)
+    samples: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    def next_call(client: httpx.AsyncClient):
+        kind = rng.choice(("create", "status", "read")) if scenario == "mixed" else scenario
+        if kind == "create":
+            return client.post("/requests/", json={"form_definition_id": 1, "form_data": {"employee": "Bench", "department": "IT"}})
+        if kind == "status":
+            return client.put(f"/requests/{rng.choice(request_ids)}/status", params={"status": rng.choice(common.STATUSES)})
+        return client.get(f"/requests/{rng.choice(request_ids)}")
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await next_call(client)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests_per_second": len(samples) / elapsed, "errors": errors, **common.summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per server")
+    parser.add_argument("--requests", type=int, default=10_000, help="requests seeded before the run")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    common.reset_schema()
+    from database import SessionLocal
+    import main  # noqa: F401, creates the tables
+
+    with SessionLocal() as db:
+        request_ids = common.seed(db, requests=args.requests)["requests"]
+
+    rows = []
+    for mode in ("sync", "async"):
+        server = start_server(mode, args.port, args.workers)
+        try:
+            for scenario in SCENARIOS:
+                result = asyncio.run(run_scenario(f"http://127.0.0.1:{args.port}", scenario, args.concurrency, args.seconds, request_ids))
+                rows.append([mode, scenario, f"{result['requests_per_second']:.0f}", f"{result['p50']:.1f}", f"{result['p99']:.1f}", result["errors"]])
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{args.concurrency} clients, {args.seconds:g}s per scenario, {args.workers} worker(s), "
+          f"pool {os.getenv('DB_POOL_SIZE', '5')}+{os.getenv('DB_MAX_OVERFLOW', '10')}")
+    common.print_table(["mode", "scenario", "req/s", "p50 ms", "p99 ms", "errors"], rows)
+
+
+if __name__ == "__main__":
+    main()
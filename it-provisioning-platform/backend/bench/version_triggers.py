@@ -0,0 +1,106 @@
+"""
+Write throughput under the table_versions triggers (etag.py).
+
+Concurrent threads run short transactions that each update a different
+row, so any waiting comes from the version bump, not the rows themselves.
+Compared with the triggers dropped, with one counter row per table, and
+with the counter spread over VERSION_SHARDS rows per table.
+
+    BENCH_DATABASE_URL=... python -m bench.version_triggers --threads 1 8 32 --seconds 5
+"""
+
+import argparse
+import threading
+import time
+
+from bench import common
+
+from sqlalchemy import text
+
+# The trigger function before the counters were sharded, one hot row per table
+SINGLE_ROW_FUNCTION = """
+    CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO table_versions (table_name, shard, version) VALUES (TG_TABLE_NAME, 0, 1)
+        ON CONFLICT (table_name, shard) DO UPDATE SET version = table_versions.version + 1;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+STATEMENTS = {
+    "status change": "UPDATE requests SET status = 'completed' WHERE id = :id",
+    "temp account claim": "UPDATE temp_accounts SET is_in_use = NOT is_in_use WHERE id = :id",
+}
+
+
+def install(engine, variant: str):
+    import etag
+
+    with engine.begin() as connection:
+        etag.install_version_triggers(connection)
+        if variant == "single row":
+            connection.execute(text(SINGLE_ROW_FUNCTION))
+        elif variant == "no triggers":
+            for table in etag.TRACKED_TABLES:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_version ON {table}"))
+
+
+def run(engine, statement: str, threads: int, seconds: float, rows_per_thread: int) -> dict:
+    samples: list[list[float]] = [[] for _ in range(threads)]
+    deadline = time.perf_counter() + seconds
+
+    def worker(index: int):
+        ids = range(index * rows_per_thread + 1, (index + 1) * rows_per_thread + 1)
+        with engine.connect() as connection:
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                with connection.begin():
+                    connection.execute(text(statement), {"id": ids[i % rows_per_thread]})
+                samples[index].append(time.perf_counter() - started)
+                i += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    flat = [sample for thread_samples in samples for sample in thread_samples]
+    return {"tps": len(flat) / elapsed, **common.summarize(flat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    rows_per_thread = 50
+    common.reset_schema()
+    from sqlalchemy import create_engine
+
+    import main  # noqa: F401, creates the tables and triggers
+    from database import SessionLocal
+
+    most_threads = max(args.threads)
+    with SessionLocal() as db:
+        common.seed(db, requests=most_threads * rows_per_thread, temp_accounts=most_threads * rows_per_thread, mailboxes=0)
+    engine = create_engine(common.BENCH_DATABASE_URL, pool_size=most_threads + 1)
+
+    rows = []
+    for variant in ("no triggers", "single row", "sharded"):
+        install(engine, variant)
+        for name, statement in STATEMENTS.items():
+            for threads in args.threads:
+                result = run(engine, statement, threads, args.seconds, rows_per_thread)
+                rows.append([variant, name, threads, f"{result['tps']:.0f}", f"{result['p50']:.2f}", f"{result['p99']:.2f}"])
+
+    print(f"\n{args.seconds:g}s per run, each transaction updates one row of its own")
+    common.print_table(["triggers", "write", "threads", "tx/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
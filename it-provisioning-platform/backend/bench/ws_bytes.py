@@ -0,0 +1,94 @@
+"""
+Bytes per second sent to each dashboard client, read from the ws_bytes_sent
+counter, for the three ways events have been delivered:
+
+- full:        every event carries the whole request (before topics and deltas)
+- delta:       events carry the request id and changed fields only
+- subscribed:  deltas, with each client subscribed to one service
+
+Replays status changes of seeded requests through a ConnectionManager on
+the in-memory bus to fake fast clients.
+
+    BENCH_DATABASE_URL=... python -m bench.ws_bytes --clients 200 --events 500 --rate 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from bench import common
+from bench.ws_fanout import FakeWebSocket
+
+import metrics
+from event_bus import InMemoryEventBus
+from ws_manager import ConnectionManager
+
+
+async def run_variant(variant: str, events: list[tuple[dict, dict]], clients: int, rate: float) -> dict:
+    manager = ConnectionManager(queue_size=10_000, bus=InMemoryEventBus())
+    await manager.start()
+    sockets = [FakeWebSocket("fast", 0, 0) for _ in range(clients)]
+    for i, websocket in enumerate(sockets):
+        topics = {f"service:{common.SERVICES[i % len(common.SERVICES)]}"} if variant == "subscribed" else None
+        await manager.connect(websocket, topics=topics)
+
+    bytes_sent = metrics.counter("ws_bytes_sent")
+    before = bytes_sent.value
+    started = time.perf_counter()
+    for i, (full, delta) in enumerate(events):
+        await manager.broadcast(full if variant == "full" else delta)
+        await asyncio.sleep(max(0.0, started + (i + 1) / rate - time.perf_counter()))
+    while any(client.queue.qsize() for client in manager.active_connections.values()):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    sent = bytes_sent.value - before
+    await manager.stop()
+
+    messages = sum(len(websocket.received) for websocket in sockets)
+    return {
+        "bytes_per_client_second": sent / clients / elapsed,
+        "bytes_per_message": sent / messages if messages else 0,
+        "messages_per_client": messages / clients,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50, help="events published per second")
+    args = parser.parse_args()
+
+    common.reset_schema()
+    import crud
+    import main
+    import schemas
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        request_ids = common.seed(db, requests=2000, mailboxes=0)["requests"]
+        rng = random.Random(0)
+        events = []
+        for _ in range(args.events):
+            request = schemas.Request.model_validate(crud.get_request(db, rng.choice(request_ids)))
+            status = rng.choice(common.STATUSES)
+            full = {"type": "status_update", "data": request.model_dump(mode="json") | {"status": status}, "service": request.submitted_by.service}
+            events.append((full, main.request_event("status_update", request, status=status)))
+
+    rows = []
+    for variant in ("full", "delta", "subscribed"):
+        result = asyncio.run(run_variant(variant, events, args.clients, args.rate))
+        rows.append([
+            variant,
+            f"{result['bytes_per_client_second']:,.0f}",
+            f"{result['bytes_per_message']:,.0f}",
+            f"{result['messages_per_client']:.0f}",
+        ])
+
+    print(f"\n{args.clients} clients, {args.events} status changes at {args.rate:g}/s")
+    common.print_table(["events", "bytes/s per client", "bytes/message", "messages/client"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Fan-out load test of the dashboard WebSocket hub.
+
+Connects thousands of fake sockets to a ConnectionManager on the in-memory
+event bus, no server or database involved, and publishes events at a fixed
+rate. The sockets come in four kinds:
+
+- fast:    accept every message straight away
+- slow:    take --slow-ms per message, so their queues fill and messages are dropped
+- stalled: never complete a send after the first few, reaped after the send timeout
+- dead:    fail every send after the first few, reaped on the next send
+
+Reports the delay from publish to delivery for the sockets that keep up,
+messages dropped and clients reaped, and the time one fan-out takes.
+
+    python -m bench.ws_fanout --clients 5000 --rate 25
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from bench import common
+
+import metrics
+from event_bus import InMemoryEventBus
+from ws_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Stands in for starlette's WebSocket, recording when each message arrives."""
+
+    def __init__(self, kind: str, slow_seconds: float, healthy_sends: int):
+        self.kind = kind
+        self.slow_seconds = slow_seconds
+        self.healthy_sends = healthy_sends
+        self.received: list[tuple[int, float]] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.kind == "slow":
+            await asyncio.sleep(self.slow_seconds)
+        elif self.kind in ("stalled", "dead") and len(self.received) >= self.healthy_sends:
+            if self.kind == "dead":
+                raise ConnectionResetError("peer went away")
+            await asyncio.Event().wait()
+        # Messages end with "seq": <n>}, cheaper to slice than to parse thousands of times per event
+        self.received.append((int(message[message.rindex(":") + 1:-1]), time.perf_counter()))
+
+    async def close(self):
+        self.closed = True
+
+
+async def run(args) -> None:
+    rng = random.Random(0)
+    kinds = ["slow"] * round(args.clients * args.slow) + ["stalled"] * round(args.clients * args.stalled) + ["dead"] * round(args.clients * args.dead)
+    kinds += ["fast"] * (args.clients - len(kinds))
+    rng.shuffle(kinds)
+
+    manager = ConnectionManager(queue_size=args.queue_size, drop_policy=args.drop_policy, send_timeout=args.send_timeout, bus=InMemoryEventBus())
+    await manager.start()
+
+    fan_out_seconds = []
+    fan_out = manager._fan_out
+
+    def timed_fan_out(seq, event):
+        started = time.perf_counter()
+        fan_out(seq, event)
+        fan_out_seconds.append(time.perf_counter() - started)
+
+    manager.bus._handler = timed_fan_out
+
+    sockets = [FakeWebSocket(kind, args.slow_ms / 1000, healthy_sends=3) for kind in kinds]
+    for websocket in sockets:
+        await manager.connect(websocket)
+
+    published_at: dict[int, float] = {}
+    interval = 1 / args.rate
+    started = time.perf_counter()
+    for i in range(args.events):
+        event = {"type": "status_update", "service": "IT", "data": {"id": i, "status": "completed"}}
+        published_at[i + 1] = time.perf_counter()
+        await manager.broadcast(event)
+        await asyncio.sleep(max(0.0, started + (i + 1) * interval - time.perf_counter()))
+
+    # Let queues drain and stalled sends time out
+    await asyncio.sleep(args.send_timeout + 1)
+    stats = manager.stats()
+    reaped = {websocket for websocket in sockets if websocket.closed}
+    await manager.stop()
+
+    counters = metrics.snapshot()["counters"]
+    print(f"\n{args.clients} clients ({', '.join(f'{kinds.count(k)} {k}' for k in ('fast', 'slow', 'stalled', 'dead'))}), "
+          f"{args.events} events at {args.rate}/s, queue {args.queue_size}, {args.drop_policy}, send timeout {args.send_timeout}s")
+
+    rows = []
+    for kind in ("fast", "slow", "stalled", "dead"):
+        group = [websocket for websocket in sockets if websocket.kind == kind]
+        if not group:
+            continue
+        delays = [at - published_at[seq] for websocket in group for seq, at in websocket.received]
+        delivered = sum(len(websocket.received) for websocket in group)
+        summary = common.summarize(delays) if delays else None
+        rows.append([
+            kind,
+            len(group),
+            f"{delivered / (len(group) * args.events):.1%}",
+            f"{summary['p50']:.1f}" if summary else "-",
+            f"{summary['p99']:.1f}" if summary else "-",
+            sum(1 for websocket in group if websocket in reaped),
+        ])
+    common.print_table(["kind", "clients", "delivered", "p50 delay ms", "p99 delay ms", "reaped"], rows)
+
+    fan_out = common.summarize(fan_out_seconds)
+    print(f"\nfan-out per event: p50 {fan_out['p50']:.2f}ms p99 {fan_out['p99']:.2f}ms max {fan_out['max']:.2f}ms")
+    print(f"still connected: {stats['connections']}, "
+          f"dropped: {counters.get('ws_messages_dropped', 0)}, reaped: {counters.get('ws_clients_reaped', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=10, help="events published per second")
+    parser.add_argument("--slow", type=float, default=0.10, help="share of slow clients")
+    parser.add_argument("--stalled", type=float, default=0.02, help="share of stalled clients")
+    parser.add_argument("--dead", type=float, default=0.02, help="share of dead clients")
+    parser.add_argument("--slow-ms", type=float, default=100)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--drop-policy", default="drop_oldest")
+    parser.add_argument("--send-timeout", type=float, default=2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Bulk CSV Import Engine
+
+This module loads the CSV exports used to initialize the application
+(temp accounts, AD users and shared mailboxes) with set-based upserts.
+Rows are staged in memory by their natural key and written with one
+INSERT ... ON CONFLICT DO UPDATE statement per chunk, instead of one
+SELECT (and sometimes one commit) per row.
+
+Uploads are streamed: the file is read in fixed-size chunks and decoded
+incrementally, so only the chunk being decoded and the rows staged for
+the next statement are ever held in memory, whatever the file size.
+"""
+
+import codecs
+import csv
+import time
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from sqlalchemy import literal_column, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import mailbox_access
+import models
+from identity_cache import identity_cache
+
+# Number of staged rows written per INSERT ... ON CONFLICT statement
+DEFAULT_CHUNK_SIZE = 1000
+
+# Number of bytes read from the uploaded file at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ImportSpec:
+    """Describes how CSV rows map onto a table for a bulk upsert."""
+
+    model: type[models.Base]
+    key: str  # Unique column used as the conflict target
+    columns: dict[str, str]  # CSV header -> model column
+    required: list[str]  # CSV headers that must be non-empty
+    update_columns: list[str]  # Columns refreshed when the key already exists
+    defaults: dict[str, Any] = field(default_factory=dict)  # Values set on insert only
+    after_upsert: Callable[[Session, list[int]], None] | None = None  # Called with the ids of the rows written, before the commit
+    after_chunk: Callable[[], None] | None = None  # Called once each chunk is committed
+
+    def stage(self, row: dict[str, str | None]) -> dict[str, Any] | None:
+        """Convert a CSV row into a column dict, or None if it must be skipped."""
+        if any(not row.get(header) for header in self.required):
+            return None
+        record = {column: row.get(header) or "" for header, column in self.columns.items()}
+        return {**self.defaults, **record}
+
+
+@dataclass
+class ImportResult:
+    """Counters and timing collected while running an import."""
+
+    added: int = 0
+    updated: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.added + self.updated + self.skipped
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "added": self.added,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+TEMP_ACCOUNTS = ImportSpec(
+    model=models.TempAccount,
+    key="user_principal_name",
+    columns={"userPrincipalName": "user_principal_name", "displayName": "display_name"},
+    required=["userPrincipalName", "displayName"],
+    update_columns=["display_name"],
+    defaults={"is_in_use": False},
+)
+
+AD_USERS = ImportSpec(
+    model=models.User,
+    key="email",
+    columns={"EmailAddress": "email", "DisplayName": "full_name"},
+    required=["EmailAddress", "DisplayName"],
+    update_columns=["full_name"],
+    defaults={"role": models.UserRole.manager},  # Assign a default role to new users
+    after_chunk=identity_cache.invalidate_all,
+)
+
+SHARED_MAILBOXES = ImportSpec(
+    model=models.SharedMailbox,
+    key="primary_smtp_address",
+    columns={
+        "PrimarySmtpAddress": "primary_smtp_address",
+        "DisplayName": "display_name",
+        "FullAccess": "full_access_users",
+    },
+    required=["PrimarySmtpAddress", "DisplayName"],
+    update_columns=["display_name", "full_access_users"],
+    after_upsert=mailbox_access.sync,
+)
+
+
+def iter_lines(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield newline-terminated text lines from a binary stream.
+
+    The stream is read chunk_size bytes at a time and decoded incrementally,
+    so multi-byte characters split across chunks are handled. A leading
+    UTF-8 BOM (as written by PowerShell's Export-Csv) is stripped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        pending += decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            break
+        end = pending.rfind("\n")
+        if end == -1:
+            continue
+        complete, pending = pending[:end], pending[end + 1:]
+        for line in complete.split("\n"):
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(stream: BinaryIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict[str, str | None]]:
+    """Lazily parse a binary CSV stream into dict rows keyed by the header line."""
+    # csv copes with quoted fields spanning several of the lines we yield
+    return csv.DictReader(iter_lines(stream, chunk_size))
+
+
+def _upsert_chunk(db: Session, spec: ImportSpec, staged: dict[str, dict[str, Any]], result: ImportResult):
+    """Write one chunk of staged rows with a single INSERT ... ON CONFLICT DO UPDATE."""
+    table = spec.model.__table__
+    stmt = insert(table).values(list(staged.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[spec.key]],
+        set_={column: stmt.excluded[column] for column in spec.update_columns},
+        # Only touch rows whose values actually changed, unchanged rows count as skipped
+        where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in spec.update_columns)),
+    )
+    # xmax is 0 for freshly inserted tuples and non-zero for updated ones
+    stmt = stmt.returning(literal_column("(xmax = 0)").label("inserted"), table.c.id)
+
+    written = db.execute(stmt).all()
+    inserted = sum(1 for row in written if row.inserted)
+    result.added += inserted
+    result.updated += len(written) - inserted
+    result.skipped += len(staged) - len(written)
+    if spec.after_upsert:
+        spec.after_upsert(db, [row.id for row in written])
+    db.commit()
+    if spec.after_chunk:
+        spec.after_chunk()
+
+
+def run_import(
+    db: Session,
+    spec: ImportSpec,
+    rows: Iterable[dict[str, str | None]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_chunk: Callable[[ImportResult], None] | None = None,
+) -> ImportResult:
+    """
+    Upsert CSV rows into the table described by spec.
+
+    Rows missing a required field are skipped. When the same key appears
+    more than once in a chunk the last occurrence wins and the earlier ones
+    are counted as skipped. Each chunk is committed on its own so a failure
+    only loses the chunk in flight, and re-running an import is idempotent.
+    on_chunk, if given, is called with the running totals after each commit.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    staged: dict[str, dict[str, Any]] = {}
+
+    for row in rows:
+        record = spec.stage(row)
+        if record is None:
+            result.skipped += 1
+            continue
+        if record[spec.key] in staged:
+            result.skipped += 1
+        staged[record[spec.key]] = record
+        if len(staged) >= chunk_size:
+            _upsert_chunk(db, spec, staged, result)
+            staged = {}
+            result.elapsed_seconds = time.perf_counter() - started
+            if on_chunk:
+                on_chunk(result)
+
+    if staged:
+        _upsert_chunk(db, spec, staged, result)
+
+    result.elapsed_seconds = time.perf_counter() - started
+    if on_chunk:
+        on_chunk(result)
+    return result
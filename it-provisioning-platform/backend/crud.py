@@ -1,6 +1,19 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, Date
-import models, schemas
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import and_, delete, exists, func, or_, select, true, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import models, schemas, pagination, rollups
+from identity_cache import identity_cache
+from audit import audit_sink
+from definition_cache import definition_cache
+from pydantic import TypeAdapter
+
+# Pairs written per statement by the permission batch, well under the bind parameter limit
+PERMISSION_CHUNK_SIZE = 5000
+
+FORM_DEFINITION = TypeAdapter(schemas.FormDefinition)
+FORM_DEFINITION_LIST = TypeAdapter(list[schemas.FormDefinition])
+WALKTHROUGH_TEMPLATE = TypeAdapter(schemas.WalkthroughTemplate)
+WALKTHROUGH_TEMPLATE_LIST = TypeAdapter(list[schemas.WalkthroughTemplate])
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -13,6 +26,7 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    identity_cache.invalidate_user(db_user.id)
     return db_user
 
 def create_form_definition(db: Session, form: schemas.FormDefinitionCreate, user_id: int):
@@ -26,13 +40,22 @@ def create_form_definition(db: Session, form: schemas.FormDefinitionCreate, user
     db.add(db_form)
     db.commit()
     db.refresh(db_form)
+    definition_cache.invalidate("form_definitions")
     return db_form
 
-def get_form_definitions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.FormDefinition).offset(skip).limit(limit).all()
+# Form definitions and walkthrough templates are read through the definition cache,
+# so these return the response models rather than ORM objects
+def get_form_definitions(db: Session, skip: int = 0, limit: int = 100) -> list[schemas.FormDefinition]:
+    def load():
+        forms = db.query(models.FormDefinition).order_by(models.FormDefinition.id).offset(skip).limit(limit).all()
+        return [schemas.FormDefinition.model_validate(form) for form in forms]
+    return definition_cache.get(db, "form_definitions", f"list:{skip}:{limit}", FORM_DEFINITION_LIST, load)
 
-def get_form_definition(db: Session, form_id: int):
-    return db.query(models.FormDefinition).filter(models.FormDefinition.id == form_id).first()
+def get_form_definition(db: Session, form_id: int) -> schemas.FormDefinition | None:
+    def load():
+        form = db.query(models.FormDefinition).filter(models.FormDefinition.id == form_id).first()
+        return schemas.FormDefinition.model_validate(form) if form else None
+    return definition_cache.get(db, "form_definitions", f"id:{form_id}", FORM_DEFINITION, load)
 
 def create_request(db: Session, request: schemas.RequestCreate, user_id: int):
     db_request = models.Request(
@@ -41,11 +64,13 @@ def create_request(db: Session, request: schemas.RequestCreate, user_id: int):
         submitted_by_manager_id=user_id
     )
     db.add(db_request)
+    db.flush()
+    rollups.record_created(db, db_request)
     db.commit()
     db.refresh(db_request)
     return db_request
 
-def get_requests(db: Session, skip: int = 0, limit: int = 100, service: str | None = None):
+def _requests_query(db: Session, service: str | None = None, form_data: dict | None = None):
     # Use joinedload to eagerly load related objects
     query = db.query(models.Request).options(
         joinedload(models.Request.submitted_by),
@@ -57,8 +82,84 @@ def get_requests(db: Session, skip: int = 0, limit: int = 100, service: str | No
     if service:
         # Join with the User table and filter by the 'service' column
         query = query.join(models.User, models.Request.submitted_by_manager_id == models.User.id).filter(models.User.service == service)
-        
-    return query.order_by(models.Request.timestamp.desc()).offset(skip).limit(limit).all()
+    if form_data:
+        # JSONB containment, served by the GIN index on form_data
+        query = query.filter(models.Request.form_data.contains(form_data))
+    return query
+
+def get_requests(db: Session, skip: int = 0, limit: int = 100, service: str | None = None, form_data: dict | None = None):
+    query = _requests_query(db, service, form_data)
+    return query.order_by(models.Request.timestamp.desc(), models.Request.id.desc()).offset(skip).limit(limit).all()
+
+def get_requests_page(db: Session, cursor: pagination.Cursor | None, limit: int = 100, service: str | None = None, form_data: dict | None = None):
+    """Keyset-paginated variant of get_requests, ordered on (timestamp, id)."""
+    query = _requests_query(db, service, form_data)
+    return pagination.keyset_page(query, models.Request.timestamp, models.Request.id, cursor, limit)
+
+def _request_summaries_query(db: Session, service: str | None = None, form_data: dict | None = None):
+    """Columns for RequestSummary only, leaving the JSONB documents in the database."""
+    query = (
+        db.query(
+            models.Request.id,
+            models.Request.status,
+            models.Request.timestamp,
+            models.Request.form_definition_id,
+            models.User.id.label("submitted_by_id"),
+            models.User.full_name.label("submitted_by_full_name"),
+            models.User.email.label("submitted_by_email"),
+            models.User.service.label("submitted_by_service"),
+            models.FormDefinition.name.label("form_definition_name"),
+            models.TempAccount.id.label("temp_account_id"),
+            models.TempAccount.user_principal_name.label("temp_account_user_principal_name"),
+            models.TempAccount.display_name.label("temp_account_display_name"),
+            models.TempAccount.is_in_use.label("temp_account_is_in_use"),
+        )
+        .outerjoin(models.User, models.Request.submitted_by_manager_id == models.User.id)
+        .outerjoin(models.FormDefinition, models.Request.form_definition_id == models.FormDefinition.id)
+        .outerjoin(models.TempAccount, models.Request.assigned_temp_account_id == models.TempAccount.id)
+    )
+    if service:
+        query = query.filter(models.User.service == service)
+    if form_data:
+        query = query.filter(models.Request.form_data.contains(form_data))
+    return query
+
+def request_summary(row) -> schemas.RequestSummary:
+    return schemas.RequestSummary(
+        id=row.id,
+        status=row.status.value,
+        timestamp=row.timestamp,
+        form_definition_id=row.form_definition_id,
+        submitted_by=schemas.UserSummary(
+            id=row.submitted_by_id,
+            full_name=row.submitted_by_full_name,
+            email=row.submitted_by_email,
+            service=row.submitted_by_service,
+        ) if row.submitted_by_id is not None else None,
+        form_definition=schemas.FormDefinitionSummary(
+            id=row.form_definition_id,
+            name=row.form_definition_name,
+        ) if row.form_definition_name is not None else None,
+        assigned_temp_account=schemas.TempAccount(
+            id=row.temp_account_id,
+            user_principal_name=row.temp_account_user_principal_name,
+            display_name=row.temp_account_display_name,
+            is_in_use=row.temp_account_is_in_use,
+        ) if row.temp_account_id is not None else None,
+    )
+
+def get_request_summaries(db: Session, skip: int = 0, limit: int = 100, service: str | None = None, form_data: dict | None = None):
+    query = _request_summaries_query(db, service, form_data)
+    return query.order_by(models.Request.timestamp.desc(), models.Request.id.desc()).offset(skip).limit(limit).all()
+
+def get_request_summaries_page(db: Session, cursor: pagination.Cursor | None, limit: int = 100, service: str | None = None, form_data: dict | None = None):
+    """Keyset-paginated variant of get_request_summaries, ordered on (timestamp, id)."""
+    query = _request_summaries_query(db, service, form_data)
+    return pagination.keyset_page(query, models.Request.timestamp, models.Request.id, cursor, limit)
+
+def get_request_summary(db: Session, request_id: int) -> schemas.RequestSummary | None:
+    row = _request_summaries_query(db).filter(models.Request.id == request_id).first()
+    return request_summary(row) if row else None
 
 def get_request(db: Session, request_id: int):
     """Get a single request with all related data eagerly loaded"""
@@ -74,12 +175,256 @@ def get_request(db: Session, request_id: int):
         .first()
     )
 
+# Columns and relationships a detail view can ask for with fields= and expand=
+REQUEST_FIELDS = {
+    "id": models.Request.id,
+    "status": models.Request.status,
+    "timestamp": models.Request.timestamp,
+    "form_data": models.Request.form_data,
+    "walkthrough_state": models.Request.walkthrough_state,
+    "form_definition_id": models.Request.form_definition_id,
+    "submitted_by_manager_id": models.Request.submitted_by_manager_id,
+    "processed_by_admin_id": models.Request.processed_by_admin_id,
+    "assigned_temp_account_id": models.Request.assigned_temp_account_id,
+}
+REQUEST_EXPANSIONS = {
+    "submitted_by": (models.Request.submitted_by, schemas.User),
+    "processed_by": (models.Request.processed_by, schemas.User),
+    "form_definition": (models.Request.form_definition, schemas.FormDefinition),
+    "assigned_temp_account": (models.Request.assigned_temp_account, schemas.TempAccount),
+}
+
+def get_request_projection(db: Session, request_id: int, fields: list[str], expand: list[str]) -> dict | None:
+    """Get the requested columns of a request and the requested related objects, loading nothing else."""
+    columns = [REQUEST_FIELDS[field] for field in fields] or [models.Request.id]
+    options = [load_only(*columns, raiseload=True)]
+    options += [joinedload(REQUEST_EXPANSIONS[name][0]) for name in expand]
+    db_request = db.query(models.Request).options(*options).filter(models.Request.id == request_id).first()
+    if db_request is None:
+        return None
+
+    projection = {"id": db_request.id}
+    projection.update({field: getattr(db_request, field) for field in fields})
+    for name in expand:
+        related = getattr(db_request, name)
+        schema = REQUEST_EXPANSIONS[name][1]
+        projection[name] = schema.model_validate(related).model_dump(mode="json", by_alias=True) if related else None
+    return projection
+
+def get_manager_permissions(db: Session, skip: int = 0, limit: int = 100, manager: str | None = None, mailbox: str | None = None) -> list[dict]:
+    """
+    A page of managers with the shared mailboxes they can see, in a single query.
+
+    manager matches the manager's name or email and mailbox a mailbox's
+    display name or address. With mailbox, only managers seeing a matching
+    mailbox are listed, each with the matching mailboxes only.
+    """
+    association = models.manager_mailbox_association
+    managers = select(models.User.id, models.User.full_name).where(models.User.role == models.UserRole.manager)
+    if manager:
+        managers = managers.where(or_(models.User.full_name.ilike(f"%{manager}%"), models.User.email.ilike(f"%{manager}%")))
+    mailbox_filter = true()
+    if mailbox:
+        mailbox_filter = or_(
+            models.SharedMailbox.display_name.ilike(f"%{mailbox}%"),
+            models.SharedMailbox.primary_smtp_address.ilike(f"%{mailbox}%"),
+        )
+        managers = managers.where(exists().where(
+            association.c.manager_id == models.User.id,
+            association.c.mailbox_id == models.SharedMailbox.id,
+            mailbox_filter,
+        ))
+    page = managers.order_by(models.User.id).offset(skip).limit(limit).subquery()
+
+    # Managers without (matching) mailboxes are kept by the outer join, with NULL mailbox columns
+    visible = association.join(models.SharedMailbox, association.c.mailbox_id == models.SharedMailbox.id)
+    rows = db.execute(
+        select(
+            page.c.id,
+            page.c.full_name,
+            models.SharedMailbox.id.label("mailbox_id"),
+            models.SharedMailbox.display_name,
+            models.SharedMailbox.primary_smtp_address,
+        )
+        .select_from(page)
+        .outerjoin(visible, and_(association.c.manager_id == page.c.id, mailbox_filter))
+        .order_by(page.c.id, models.SharedMailbox.display_name, models.SharedMailbox.id)
+    )
+
+    permissions: dict[int, dict] = {}
+    for row in rows:
+        entry = permissions.setdefault(row.id, {"manager_id": row.id, "manager_name": row.full_name, "visible_mailboxes": []})
+        if row.mailbox_id is not None:
+            entry["visible_mailboxes"].append({
+                "id": row.mailbox_id,
+                "display_name": row.display_name,
+                "primary_smtp_address": row.primary_smtp_address,
+            })
+    return list(permissions.values())
+
+def grant_mailbox_permissions(db: Session, pairs: list[tuple[int, int]]) -> set[tuple[int, int]]:
+    """Insert (manager_id, mailbox_id) pairs set-based, returning the pairs that were not granted already."""
+    association = models.manager_mailbox_association
+    granted = set()
+    pairs = list(dict.fromkeys(pairs))
+    for start in range(0, len(pairs), PERMISSION_CHUNK_SIZE):
+        statement = (
+            pg_insert(association)
+            .values([{"manager_id": manager_id, "mailbox_id": mailbox_id} for manager_id, mailbox_id in pairs[start:start + PERMISSION_CHUNK_SIZE]])
+            .on_conflict_do_nothing()
+            .returning(association.c.manager_id, association.c.mailbox_id)
+        )
+        granted.update((row.manager_id, row.mailbox_id) for row in db.execute(statement))
+    return granted
+
+def revoke_mailbox_permissions(db: Session, pairs: list[tuple[int, int]]) -> set[tuple[int, int]]:
+    """Delete (manager_id, mailbox_id) pairs set-based, returning the pairs that existed."""
+    association = models.manager_mailbox_association
+    revoked = set()
+    pairs = list(dict.fromkeys(pairs))
+    for start in range(0, len(pairs), PERMISSION_CHUNK_SIZE):
+        statement = (
+            delete(association)
+            .where(tuple_(association.c.manager_id, association.c.mailbox_id).in_(pairs[start:start + PERMISSION_CHUNK_SIZE]))
+            .returning(association.c.manager_id, association.c.mailbox_id)
+        )
+        revoked.update((row.manager_id, row.mailbox_id) for row in db.execute(statement))
+    return revoked
+
+def apply_mailbox_permissions(db: Session, batch: schemas.MailboxPermissionBatch) -> list[schemas.MailboxPermissionResult]:
+    """
+    Apply a batch of grants, revokes and desired mailbox sets in one transaction.
+
+    Desired sets (replace) are turned into the grants and revokes that reach
+    them. Every pair gets a result: grants first, then revokes, each followed
+    by the pairs derived from replace. Pairs naming an unknown manager or
+    mailbox are skipped. Raises ValueError when a pair is both granted and
+    revoked.
+    """
+    association = models.manager_mailbox_association
+    grants = [(item.manager_id, item.mailbox_id) for item in batch.grant]
+    revokes = [(item.manager_id, item.mailbox_id) for item in batch.revoke]
+
+    if batch.replace:
+        replaced = {entry.manager_id for entry in batch.replace}
+        desired = {(entry.manager_id, mailbox_id) for entry in batch.replace for mailbox_id in entry.mailbox_ids}
+        current = {
+            (row.manager_id, row.mailbox_id)
+            for row in db.execute(
+                select(association.c.manager_id, association.c.mailbox_id).where(association.c.manager_id.in_(replaced))
+            )
+        }
+        explicit = set(grants) | set(revokes)
+        grants += sorted(desired - current - explicit)
+        revokes += sorted(current - desired - explicit)
+
+    conflicting = set(grants) & set(revokes)
+    if conflicting:
+        manager_id, mailbox_id = min(conflicting)
+        raise ValueError(f"Manager {manager_id} and mailbox {mailbox_id} are both granted and revoked")
+
+    pairs = grants + revokes
+    manager_ids = {manager_id for manager_id, _ in pairs}
+    mailbox_ids = {mailbox_id for _, mailbox_id in pairs}
+    known_managers = set(db.scalars(
+        select(models.User.id).where(models.User.id.in_(manager_ids), models.User.role == models.UserRole.manager)
+    )) if manager_ids else set()
+    known_mailboxes = set(db.scalars(
+        select(models.SharedMailbox.id).where(models.SharedMailbox.id.in_(mailbox_ids))
+    )) if mailbox_ids else set()
+
+    def known(pair: tuple[int, int]) -> bool:
+        return pair[0] in known_managers and pair[1] in known_mailboxes
+
+    granted = grant_mailbox_permissions(db, [pair for pair in grants if known(pair)])
+    revoked = revoke_mailbox_permissions(db, [pair for pair in revokes if known(pair)])
+    db.commit()
+
+    results = []
+    for action, action_pairs, done, done_status, noop_status in (
+        ("grant", grants, granted, "granted", "already_granted"),
+        ("revoke", revokes, revoked, "revoked", "not_granted"),
+    ):
+        for manager_id, mailbox_id in action_pairs:
+            if manager_id not in known_managers:
+                status = "unknown_manager"
+            elif mailbox_id not in known_mailboxes:
+                status = "unknown_mailbox"
+            elif (manager_id, mailbox_id) in done:
+                status = done_status
+                done.discard((manager_id, mailbox_id))  # Repeats of a pair in the batch report a no-op
+            else:
+                status = noop_status
+            results.append(schemas.MailboxPermissionResult(
+                manager_id=manager_id, mailbox_id=mailbox_id, action=action, status=status
+            ))
+    return results
+
+def get_mailbox_violations(db: Session, manager_id: int, mailbox_ids: list[int]) -> tuple[list[int], list[str]]:
+    """
+    Check in one query that a manager may manage every mailbox in mailbox_ids.
+
+    Returns the ids of mailboxes that do not exist and the display names of
+    those the manager has no permission on, both empty when all is well.
+    """
+    association = models.manager_mailbox_association
+    mailbox_ids = list(dict.fromkeys(mailbox_ids))
+    rows = db.execute(
+        select(models.SharedMailbox.id, models.SharedMailbox.display_name, association.c.manager_id.isnot(None).label("permitted"))
+        .outerjoin(association, and_(
+            association.c.mailbox_id == models.SharedMailbox.id,
+            association.c.manager_id == manager_id,
+        ))
+        .where(models.SharedMailbox.id.in_(mailbox_ids))
+    ).all()
+    found = {row.id: row for row in rows}
+    missing = [mailbox_id for mailbox_id in mailbox_ids if mailbox_id not in found]
+    forbidden = [found[mailbox_id].display_name for mailbox_id in mailbox_ids if mailbox_id in found and not found[mailbox_id].permitted]
+    return missing, forbidden
+
 def get_temp_accounts(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.TempAccount).offset(skip).limit(limit).all()
 
 def get_temp_account_by_upn(db: Session, upn: str):
     return db.query(models.TempAccount).filter(models.TempAccount.user_principal_name == upn).first()
 
+def claim_temp_account(db: Session, account_id: int | None = None) -> models.TempAccount | None:
+    """
+    Atomically mark a free temp account as in use and return it, the caller commits.
+
+    With account_id that account is claimed, None when it is missing or
+    already in use. Otherwise the free account with the lowest id is taken
+    with FOR UPDATE SKIP LOCKED, so concurrent claims each get a different
+    account; None when none is free.
+
+    SKIP LOCKED only keeps claims off each other's account rows. The
+    temp_accounts version trigger (etag.py) also bumps a table_versions row,
+    picked by backend pid among VERSION_SHARDS, and holds it until commit, so
+    a claim waits for any open claim transaction on the same shard. That is
+    rare with a few concurrent claims and routine once connections outnumber
+    the shards (bench.claim_contention).
+    """
+    free = models.TempAccount.is_in_use.isnot(True)
+    if account_id is None:
+        target = (
+            select(models.TempAccount.id)
+            .where(free)
+            .order_by(models.TempAccount.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+    else:
+        target = account_id
+    statement = (
+        update(models.TempAccount)
+        .where(models.TempAccount.id == target, free)
+        .values(is_in_use=True)
+        .returning(models.TempAccount)
+        .execution_options(synchronize_session=False)
+    )
+    return db.scalars(statement).first()
+
 def create_temp_account(db: Session, account: schemas.TempAccountCreate):
     db_account = models.TempAccount(
         user_principal_name=account.user_principal_name,
@@ -91,20 +436,44 @@ def create_temp_account(db: Session, account: schemas.TempAccountCreate):
     db.refresh(db_account)
     return db_account
 
-def create_audit_log(db: Session, *, actor_id: int, event_type: str, details: dict):
+def create_audit_log(db: Session, *, actor_id: int, event_type: str, details: dict, strict: bool = False):
+    """
+    Record an audit event.
+
+    By default the event goes to the batched audit sink and is written
+    within AUDIT_FLUSH_INTERVAL_SECONDS. With strict=True it is added to
+    db's transaction instead, so it commits or rolls back together with the
+    caller's changes; the caller is responsible for committing.
+    """
+    if not strict:
+        audit_sink.record(actor_id=actor_id, event_type=event_type, details=details)
+        return None
+
     log_entry = models.AuditLog(
         actor_id=actor_id,
         event_type=event_type,
         details=details
     )
     db.add(log_entry)
-    db.commit()  # Commit immediately to ensure log is saved
     return log_entry
 
-def get_audit_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.AuditLog).options(
-        joinedload(models.AuditLog.actor)
-    ).order_by(models.AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+def _audit_logs_query(db: Session, event_type: str | None = None, details: dict | None = None):
+    query = db.query(models.AuditLog).options(joinedload(models.AuditLog.actor))
+    if event_type:
+        query = query.filter(models.AuditLog.event_type == event_type)
+    if details:
+        # JSONB containment, served by the GIN index on details
+        query = query.filter(models.AuditLog.details.contains(details))
+    return query
+
+def get_audit_logs(db: Session, skip: int = 0, limit: int = 100, event_type: str | None = None, details: dict | None = None):
+    query = _audit_logs_query(db, event_type, details)
+    return query.order_by(models.AuditLog.timestamp.desc(), models.AuditLog.id.desc()).offset(skip).limit(limit).all()
+
+def get_audit_logs_page(db: Session, cursor: pagination.Cursor | None, limit: int = 100, event_type: str | None = None, details: dict | None = None):
+    """Keyset-paginated variant of get_audit_logs, ordered on (timestamp, id)."""
+    query = _audit_logs_query(db, event_type, details)
+    return pagination.keyset_page(query, models.AuditLog.timestamp, models.AuditLog.id, cursor, limit)
 
 # Walkthrough Template CRUD functions
 def create_walkthrough_template(db: Session, template: schemas.WalkthroughTemplateCreate):
@@ -117,13 +486,21 @@ def create_walkthrough_template(db: Session, template: schemas.WalkthroughTempla
     db.add(db_template)
     db.commit()
     db.refresh(db_template)
+    # Form definitions embed their suggested walkthrough
+    definition_cache.invalidate("walkthrough_templates", "form_definitions")
     return db_template
 
-def get_walkthrough_templates(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.WalkthroughTemplate).offset(skip).limit(limit).all()
+def get_walkthrough_templates(db: Session, skip: int = 0, limit: int = 100) -> list[schemas.WalkthroughTemplate]:
+    def load():
+        templates = db.query(models.WalkthroughTemplate).order_by(models.WalkthroughTemplate.id).offset(skip).limit(limit).all()
+        return [schemas.WalkthroughTemplate.model_validate(template) for template in templates]
+    return definition_cache.get(db, "walkthrough_templates", f"list:{skip}:{limit}", WALKTHROUGH_TEMPLATE_LIST, load)
 
-def get_walkthrough_template(db: Session, template_id: int):
-    return db.query(models.WalkthroughTemplate).filter(models.WalkthroughTemplate.id == template_id).first()
+def get_walkthrough_template(db: Session, template_id: int) -> schemas.WalkthroughTemplate | None:
+    def load():
+        template = db.query(models.WalkthroughTemplate).filter(models.WalkthroughTemplate.id == template_id).first()
+        return schemas.WalkthroughTemplate.model_validate(template) if template else None
+    return definition_cache.get(db, "walkthrough_templates", f"id:{template_id}", WALKTHROUGH_TEMPLATE, load)
 
 def update_walkthrough_template(db: Session, template_id: int, template: schemas.WalkthroughTemplateUpdate):
     db_template = db.query(models.WalkthroughTemplate).filter(models.WalkthroughTemplate.id == template_id).first()
@@ -138,6 +515,7 @@ def update_walkthrough_template(db: Session, template_id: int, template: schemas
             db_template.tools = template.tools
         db.commit()
         db.refresh(db_template)
+        definition_cache.invalidate("walkthrough_templates", "form_definitions")
     return db_template
 
 def delete_walkthrough_template(db: Session, template_id: int):
@@ -145,28 +523,53 @@ def delete_walkthrough_template(db: Session, template_id: int):
     if db_template:
         db.delete(db_template)
         db.commit()
+        definition_cache.invalidate("walkthrough_templates", "form_definitions")
         return True
     return False
 
 # Analytics functions
+# Analytics read the precomputed rollups (see rollups.py), empty groups are left out
 def get_request_volume_by_day(db: Session, days_limit: int = 30):
+    count = func.sum(models.RequestRollup.count)
     return (
-        db.query(
-            func.cast(models.Request.timestamp, Date).label("date"),
-            func.count(models.Request.id).label("count")
-        )
-        .group_by(func.cast(models.Request.timestamp, Date))
-        .order_by(func.cast(models.Request.timestamp, Date).desc())
+        db.query(models.RequestRollup.day.label("date"), count.label("count"))
+        .group_by(models.RequestRollup.day)
+        .having(count > 0)
+        .order_by(models.RequestRollup.day.desc())
         .limit(days_limit)
         .all()
     )
 
 def get_request_status_breakdown(db: Session):
+    count = func.sum(models.RequestRollup.count)
+    return (
+        db.query(models.RequestRollup.status.label("status"), count.label("count"))
+        .group_by(models.RequestRollup.status)
+        .having(count > 0)
+        .all()
+    )
+
+def get_request_service_breakdown(db: Session):
+    count = func.sum(models.RequestRollup.count)
+    return (
+        db.query(models.RequestRollup.service.label("service"), count.label("count"))
+        .group_by(models.RequestRollup.service)
+        .having(count > 0)
+        .order_by(count.desc())
+        .all()
+    )
+
+def get_request_form_breakdown(db: Session):
+    count = func.sum(models.RequestRollup.count)
     return (
         db.query(
-            models.Request.status.label("status"),
-            func.count(models.Request.id).label("count")
+            models.RequestRollup.form_definition_id.label("form_definition_id"),
+            models.FormDefinition.name.label("form_name"),
+            count.label("count")
         )
-        .group_by(models.Request.status)
+        .outerjoin(models.FormDefinition, models.FormDefinition.id == models.RequestRollup.form_definition_id)
+        .group_by(models.RequestRollup.form_definition_id, models.FormDefinition.name)
+        .having(count > 0)
+        .order_by(count.desc())
         .all()
     )
@@ -1,18 +1,67 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, TypeVar
 import os
 from dotenv import load_dotenv
+from pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or "postgresql://admin:your_strong_password_here@db/provisioning_db"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Same database reached through the asyncpg driver, unless configured explicitly
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg")
+
+# "async" runs async route handlers on an AsyncSession, "sync" runs them on a regular Session in the threadpool
+DATABASE_MODE = os.getenv("DATABASE_MODE", "async")
+
+# Connection pool settings, applied to both the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # Seconds, -1 never recycles
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 disables the timeout
+
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+# Each driver takes server settings differently
+sync_connect_args = {}
+async_connect_args = {}
+if DB_STATEMENT_TIMEOUT_MS:
+    sync_connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    async_connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    connect_args=sync_connect_args,
+    **pool_options,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=async_connect_args,
+    **pool_options,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
 Base = declarative_base()
 
+T = TypeVar("T")
+
 # Dependency to get a DB session
 def get_db():
     db = SessionLocal()
@@ -20,3 +69,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+class AsyncDB:
+    """
+    Runs Session-based functions (such as those in crud.py) from async route
+    handlers without blocking the event loop.
+
+    In async mode the function runs through AsyncSession.run_sync on the
+    asyncpg engine, in sync mode it runs on a regular Session in the
+    threadpool. Either way the function receives a plain Session, so it
+    should also build the response (e.g. schemas.X.model_validate) before
+    returning, while lazy loads are still allowed.
+    """
+
+    def __init__(self, session: AsyncSession | Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+# Dependency to get a non-blocking DB handle for async route handlers
+async def get_async_db():
+    if DATABASE_MODE == "async":
+        async with AsyncSessionLocal() as session:
+            yield AsyncDB(session)
+    else:
+        session = SessionLocal()
+        try:
+            yield AsyncDB(session)
+        finally:
+            await run_in_threadpool(session.close)
@@ -0,0 +1,148 @@
+"""
+Database Explorer
+
+Browsing of arbitrary tables for the admin database explorer:
+
+- Tables come from the reflected schema snapshot (schema_cache.py), instead
+  of inspecting the catalog on every call.
+- Rows are paged with a keyset on (sort column, primary key), so the
+  thousandth page costs the same as the first. Cursors are opaque strings
+  holding the last row's key.
+- Filters are column equality tests and sorting is by a single column,
+  both checked against the reflected columns; values are always bound
+  parameters, never formatted into the SQL.
+- Row counts are the planner's estimate (pg_class.reltuples), which is
+  free, rather than a COUNT(*) over the whole table.
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import JSON, Table, and_, or_, select, text, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+import fast_json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(sort_value, key: list) -> str:
+    payload = fast_json.dumps([sort_value, key])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, key = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(key, list):
+            raise ValueError(key)
+        return sort_value, key
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def estimated_row_count(db: Session, table_name: str) -> int | None:
+    """Planner estimate of the table's rows, None until the table has been analyzed."""
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": f'"{table_name}"'},
+    ).scalar()
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+def _column(table: Table, name: str):
+    if name not in table.columns:
+        raise HTTPException(status_code=400, detail=f"Unknown column '{name}' in table '{table.name}'")
+    return table.columns[name]
+
+
+def fetch_rows(
+    db: Session,
+    table: Table,
+    filters: dict | None = None,
+    sort: str | None = None,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> tuple[list[dict], str | None]:
+    """
+    One page of a table's rows as dicts, with the cursor of the next page.
+
+    sort is a column name, prefixed with "-" for descending order. Rows are
+    ordered by it (nulls last) and then by the primary key.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key_columns = list(table.primary_key.columns)
+    statement = select(table)
+
+    for name, value in (filters or {}).items():
+        column = _column(table, name)
+        statement = statement.where(column.is_(None) if value is None else column == value)
+
+    descending = bool(sort) and sort.startswith("-")
+    sort_column = _column(table, sort.lstrip("-")) if sort else None
+    if sort_column is not None and isinstance(sort_column.type, (JSON, JSONB)):
+        raise HTTPException(status_code=400, detail=f"Cannot sort on JSON column '{sort_column.name}'")
+    if sort_column is not None and sort_column in key_columns and len(key_columns) == 1:
+        sort_column = None  # Already ordered by the primary key
+
+    if not key_columns:
+        # Without a key there is nothing to page on, return the first page only
+        rows = db.execute(statement.limit(limit)).mappings().all()
+        return [dict(row) for row in rows], None
+
+    key = tuple_(*key_columns)
+    if cursor:
+        sort_value, last_key = decode_cursor(cursor)
+        if len(last_key) != len(key_columns):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        after_key = key < tuple_(*last_key) if descending else key > tuple_(*last_key)
+        if sort_column is None:
+            statement = statement.where(after_key)
+        elif sort_value is None:
+            # Nulls sort last, only rows with a null value and a later key remain
+            statement = statement.where(and_(sort_column.is_(None), after_key))
+        else:
+            after_value = sort_column < sort_value if descending else sort_column > sort_value
+            statement = statement.where(or_(
+                after_value,
+                and_(sort_column == sort_value, after_key),
+                sort_column.is_(None),
+            ))
+
+    order = []
+    if sort_column is not None:
+        order.append((sort_column.desc() if descending else sort_column.asc()).nulls_last())
+    order += [column.desc() if descending else column.asc() for column in key_columns]
+    rows = db.execute(statement.order_by(*order).limit(limit + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            last[sort_column.name] if sort_column is not None else None,
+            [last[column.name] for column in key_columns],
+        )
+    return [dict(row) for row in rows], next_cursor
+
+
+def table_info(db: Session, table: Table) -> dict:
+    """Columns, primary key and estimated row count of a table."""
+    return {
+        "name": table.name,
+        "columns": [
+            {
+                "name": column.name,
+                "type": str(column.type),
+                "nullable": column.nullable,
+                "primary_key": column.primary_key,
+            }
+            for column in table.columns
+        ],
+        "primary_key": [column.name for column in table.primary_key.columns],
+        "estimated_rows": estimated_row_count(db, table.name),
+    }
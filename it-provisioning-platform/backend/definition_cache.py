@@ -0,0 +1,135 @@
+"""
+Form Definition and Walkthrough Template Cache
+
+Form schemas and walkthrough steps are large JSONB documents that rarely
+change. crud reads them through this cache, which stores the serialized
+response models keyed on the versions of the tables they are built from
+(table_versions, see etag.py). A write in any worker bumps the version, so
+stale entries are never served, and the write paths also drop their local
+entries right away to free the memory.
+
+Entries live in an in-process LRU capped at DEFINITION_CACHE_MAX_BYTES.
+Setting DEFINITION_CACHE_URL to a Redis URL adds a shared second level so
+workers reuse each other's loads (requires the optional redis package).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, TypeVar
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+import metrics
+from etag import get_table_versions
+
+try:
+    import redis
+except ImportError:  # Only needed for the shared backend
+    redis = None
+
+DEFINITION_CACHE_MAX_BYTES = int(os.getenv("DEFINITION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+DEFINITION_CACHE_URL = os.getenv("DEFINITION_CACHE_URL")
+DEFINITION_CACHE_SHARED_TTL_SECONDS = int(os.getenv("DEFINITION_CACHE_SHARED_TTL_SECONDS", "3600"))
+
+# Tables each namespace's cached responses are built from
+NAMESPACES = {
+    "form_definitions": ("form_definitions", "users", "walkthrough_templates"),
+    "walkthrough_templates": ("walkthrough_templates",),
+}
+
+T = TypeVar("T")
+
+
+class RedisBackend:
+    """Shared second level, entries expire on their own since old versions are never read again."""
+
+    def __init__(self, url: str, ttl_seconds: int = DEFINITION_CACHE_SHARED_TTL_SECONDS):
+        if redis is None:
+            raise RuntimeError("DEFINITION_CACHE_URL is set but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl_seconds
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self._client.get(key)
+        except redis.RedisError:
+            metrics.counter("definition_cache_shared_errors").inc()
+            return None  # Fall back to the database
+
+    def set(self, key: str, value: bytes):
+        try:
+            self._client.set(key, value, ex=self._ttl)
+        except redis.RedisError:
+            metrics.counter("definition_cache_shared_errors").inc()
+
+
+class DefinitionCache:
+    def __init__(self, max_bytes: int = DEFINITION_CACHE_MAX_BYTES, shared: RedisBackend | None = None):
+        self._max_bytes = max_bytes
+        self._shared = shared
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = metrics.counter("definition_cache_hits")
+        self._misses = metrics.counter("definition_cache_misses")
+        self._evictions = metrics.counter("definition_cache_evictions")
+
+    def get(self, db: Session, namespace: str, key: str, adapter: TypeAdapter[T], load: Callable[[], T | None]) -> T | None:
+        """Return the cached value for key, calling load and caching its result on a miss."""
+        versions = get_table_versions(db, NAMESPACES[namespace])
+        version = ",".join(str(versions[table]) for table in NAMESPACES[namespace])
+        cache_key = f"{namespace}:{version}:{key}"
+
+        payload = self._get_local(cache_key)
+        if payload is None and self._shared is not None:
+            payload = self._shared.get(cache_key)
+            if payload is not None:
+                self._set_local(cache_key, payload)
+        if payload is not None:
+            self._hits.inc()
+            return adapter.validate_json(payload)
+
+        self._misses.inc()
+        value = load()
+        if value is None:
+            return None  # Not found, nothing to cache
+        payload = adapter.dump_json(value)
+        self._set_local(cache_key, payload)
+        if self._shared is not None:
+            self._shared.set(cache_key, payload)
+        return value
+
+    def invalidate(self, *namespaces: str):
+        """Drop this worker's entries for namespaces after a write."""
+        prefixes = tuple(f"{namespace}:" for namespace in namespaces)
+        with self._lock:
+            for cache_key in [k for k in self._entries if k.startswith(prefixes)]:
+                self._size -= len(self._entries.pop(cache_key))
+
+    def _get_local(self, cache_key: str) -> bytes | None:
+        with self._lock:
+            payload = self._entries.get(cache_key)
+            if payload is not None:
+                self._entries.move_to_end(cache_key)
+            return payload
+
+    def _set_local(self, cache_key: str, payload: bytes):
+        if len(payload) > self._max_bytes:
+            return  # Would evict everything else
+        with self._lock:
+            previous = self._entries.pop(cache_key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[cache_key] = payload
+            self._size += len(payload)
+            # Evict least recently used entries, including those of older versions
+            while self._size > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._evictions.inc()
+
+
+# Global definition cache instance
+definition_cache = DefinitionCache(shared=RedisBackend(DEFINITION_CACHE_URL) if DEFINITION_CACHE_URL else None)
@@ -0,0 +1,127 @@
+"""
+Conditional GET (ETag / If-None-Match)
+
+Statement-level triggers bump a per-table counter in table_versions on every
+INSERT, UPDATE, DELETE or TRUNCATE. The counter is split over VERSION_SHARDS
+rows per table, picked by the writer's backend pid, and a table's version is
+their sum: with a single row, every transaction writing the table would wait
+for the previous writer to commit before it could bump the row (see
+bench/version_triggers.py). A list or detail endpoint's ETag hashes
+the versions of the tables its response is built from together with the URL
+and the caller's user-id, so checking whether a client's copy is still
+current costs one small index scan. Unchanged responses are answered with
+304 Not Modified before the endpoint queries any row data.
+
+Hits (304s) and misses are counted in the metrics registry.
+"""
+
+import hashlib
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import func, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import metrics
+import models
+from database import get_db
+
+# Tables whose changes are tracked, triggers are installed by a migration
+TRACKED_TABLES = (
+    "users",
+    "form_definitions",
+    "walkthrough_templates",
+    "requests",
+    "temp_accounts",
+    "shared_mailboxes",
+)
+
+# Rows each table's counter is spread over, concurrent writers rarely share one
+VERSION_SHARDS = 16
+
+
+class NotModified(Exception):
+    """Raised by the conditional GET dependency when the client's copy is current."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
+
+
+def install_version_triggers(connection: Connection):
+    """Migration step creating the version bump function and a trigger on each tracked table."""
+    connection.execute(text(f"""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_versions (table_name, shard, version) VALUES (TG_TABLE_NAME, pg_backend_pid() % {VERSION_SHARDS}, 1)
+            ON CONFLICT (table_name, shard) DO UPDATE SET version = table_versions.version + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    for table in TRACKED_TABLES:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_version ON {table}"))
+        connection.execute(text(
+            f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        ))
+
+
+def shard_table_versions(connection: Connection):
+    """Migration step moving table_versions from one row per table to VERSION_SHARDS rows."""
+    connection.execute(text("ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS shard INTEGER NOT NULL DEFAULT 0"))
+    key = connection.execute(text(
+        "SELECT array_agg(attname::text ORDER BY attname) FROM pg_index "
+        "JOIN pg_attribute ON attrelid = indrelid AND attnum = ANY(indkey) "
+        "WHERE indrelid = 'table_versions'::regclass AND indisprimary"
+    )).scalar()
+    if key != ["shard", "table_name"]:
+        connection.execute(text("ALTER TABLE table_versions DROP CONSTRAINT table_versions_pkey"))
+        connection.execute(text("ALTER TABLE table_versions ADD PRIMARY KEY (table_name, shard)"))
+    install_version_triggers(connection)
+
+
+def get_table_versions(db: Session, tables: tuple[str, ...]) -> dict[str, int]:
+    """Current version of each table, 0 for tables that have not changed yet."""
+    rows = (
+        db.query(models.TableVersion.table_name, func.sum(models.TableVersion.version))
+        .filter(models.TableVersion.table_name.in_(tables))
+        .group_by(models.TableVersion.table_name)
+        .all()
+    )
+    versions = {table_name: int(version) for table_name, version in rows}
+    return {table: versions.get(table, 0) for table in tables}
+
+
+def make_etag(request: Request, versions: dict[str, int]) -> str:
+    # Responses differ per URL (filters, paging) and per user (managers only see their service)
+    key = "|".join([
+        request.url.path,
+        str(request.url.query),
+        request.headers.get("user-id", ""),
+        ",".join(f"{table}={version}" for table, version in sorted(versions.items())),
+    ])
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+def conditional_get(*tables: str):
+    """Route dependency answering 304 when none of tables changed since the client's ETag."""
+    unknown = set(tables) - set(TRACKED_TABLES)
+    if unknown:
+        raise ValueError(f"Tables without version triggers: {', '.join(sorted(unknown))}")
+
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        etag = make_etag(request, get_table_versions(db, tables))
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            metrics.counter("etag_hits").inc()
+            raise NotModified(etag)
+        metrics.counter("etag_misses").inc()
+        response.headers["ETag"] = etag
+        # Let browsers keep the response but revalidate it on every poll
+        response.headers["Cache-Control"] = "no-cache"
+
+    return Depends(check)
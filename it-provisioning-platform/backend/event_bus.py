@@ -0,0 +1,241 @@
+"""
+Dashboard Event Bus
+
+Carries dashboard events between uvicorn workers. The connection manager
+publishes every broadcast here and fans out what the bus delivers, so an
+event published by one worker reaches the dashboards connected to all of
+them. EVENT_BUS_BACKEND selects the transport:
+
+- memory: delivers within this process only (default, single worker)
+- postgres: Postgres LISTEN/NOTIFY, reaches every worker using the database
+
+Every event gets a sequence number (a database sequence with the postgres
+backend) and the last EVENT_REPLAY_SIZE events are kept, so a client that
+reconnects with the highest sequence it saw receives what it missed instead of
+reloading everything.
+"""
+
+import abc
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import os
+from collections import deque
+from typing import Callable
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+import models
+from database import ASYNC_DATABASE_URL, async_engine
+
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_REPLAY_SIZE = int(os.getenv("EVENT_REPLAY_SIZE", "1000"))
+
+EVENT_CHANNEL = "dashboard_events"
+# NOTIFY payloads must stay under 8000 bytes
+MAX_NOTIFY_PAYLOAD = 7900
+RECONNECT_DELAY_SECONDS = 1.0
+
+Handler = Callable[[int, dict], None]
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus(abc.ABC):
+    """
+    Base class: replay buffer and delivery to the subscribed handlers.
+
+    Events can be delivered out of sequence order (see PostgresEventBus), so
+    the replay buffer is kept sorted by sequence number and each entry also
+    records the highest sequence delivered before it. An event that arrived
+    after a higher one may have been missed by a client that already saw the
+    higher one, since() hands it out again.
+    """
+
+    def __init__(self, replay_size: int = EVENT_REPLAY_SIZE):
+        self._replay: deque[tuple[int, int, dict]] = deque()  # (seq, highest seq delivered before it, event)
+        self._replay_size = replay_size
+        self._last_seq = 0
+        # Clients that saw less than this may have missed an event no longer buffered
+        self._complete_from = 0
+        self._handler: Handler | None = None
+        self._reset_handler: Callable[[], None] | None = None
+
+    async def start(self, handler: Handler, reset_handler: Callable[[], None] | None = None):
+        """
+        Start delivering published events to handler(seq, event).
+
+        reset_handler is called when events may have been lost, e.g. while
+        reconnecting to Postgres, so connected clients can reload.
+        """
+        self._handler = handler
+        self._reset_handler = reset_handler
+
+    async def stop(self):
+        self._handler = None
+        self._reset_handler = None
+
+    @abc.abstractmethod
+    async def publish(self, event: dict) -> int:
+        """Publish an event to every worker, returning its sequence number."""
+
+    @property
+    def last_seq(self) -> int:
+        """Highest sequence number delivered so far."""
+        return self._last_seq
+
+    def since(self, seq: int) -> list[tuple[int, dict]] | None:
+        """
+        Events a client may have missed since it saw seq, or None when they are no longer all
+        buffered and it must reload.
+
+        seq is the highest sequence number the client received. Events that arrived late are
+        included even when numbered below it, so a client may get an event twice but never misses one.
+        """
+        if seq > self._last_seq or seq < self._complete_from:
+            return None
+        return [(entry_seq, event) for entry_seq, delivered_before, event in self._replay if entry_seq > seq or delivered_before >= seq]
+
+    def _deliver(self, seq: int, event: dict):
+        entry = (seq, self._last_seq, event)
+        if seq > self._last_seq:
+            self._replay.append(entry)
+            self._last_seq = seq
+        else:
+            # Published before an event that has already arrived
+            self._replay.insert(bisect.bisect(self._replay, seq, key=lambda replayed: replayed[0]), entry)
+        while len(self._replay) > self._replay_size:
+            evicted_seq, delivered_before, _ = self._replay.popleft()
+            self._complete_from = max(self._complete_from, evicted_seq, delivered_before + 1)
+        if self._handler:
+            self._handler(seq, event)
+
+    def _reset(self):
+        """Forget the replay buffer after events may have been lost, and tell the handler."""
+        self._replay.clear()
+        self._complete_from = self._last_seq + 1
+        if self._reset_handler:
+            self._reset_handler()
+
+
+class InMemoryEventBus(EventBus):
+    """Delivers events within this process, for single worker deployments."""
+
+    def __init__(self, replay_size: int = EVENT_REPLAY_SIZE):
+        super().__init__(replay_size)
+        self._seq = itertools.count(1)
+
+    async def publish(self, event: dict) -> int:
+        seq = next(self._seq)
+        self._deliver(seq, event)
+        return seq
+
+
+class PostgresEventBus(EventBus):
+    """
+    Delivers events to every worker through Postgres LISTEN/NOTIFY.
+
+    Publishing runs NOTIFY on the async engine, each worker listens on a
+    dedicated asyncpg connection that is re-established if it drops. Events
+    published while a worker's listener is reconnecting are not delivered to
+    it, so once it listens again the worker empties its replay buffer and
+    tells its clients to resync.
+
+    Sequence numbers are taken from the database sequence before the
+    publishing transaction commits, while notifications arrive in commit
+    order: concurrent publishes can arrive out of sequence order (handled by
+    EventBus.since), and the number of a publish that rolled back never
+    arrives at all. Gaps in the numbers are therefore not a sign of loss.
+    """
+
+    def __init__(self, replay_size: int = EVENT_REPLAY_SIZE, channel: str = EVENT_CHANNEL):
+        super().__init__(replay_size)
+        self._channel = channel
+        self._dsn = make_url(ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listener_task: asyncio.Task | None = None
+
+    async def start(self, handler: Handler, reset_handler: Callable[[], None] | None = None):
+        await super().start(handler, reset_handler)
+        connected = asyncio.Event()
+        self._listener_task = asyncio.create_task(self._listen(connected))
+        self._listener_task.add_done_callback(self._listener_done)
+        # Do not accept dashboard connections before events can reach them
+        await asyncio.wait_for(connected.wait(), timeout=30)
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+        await super().stop()
+
+    async def publish(self, event: dict) -> int:
+        async with async_engine.begin() as connection:
+            seq = (await connection.execute(models.dashboard_event_seq.next_value())).scalar_one()
+            payload = json.dumps({"seq": seq, "event": event}, default=str)
+            if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+                # Too large for NOTIFY, send the reference only and let clients fetch the rest
+                data = event.get("data") or {}
+                event = {**event, "data": {"id": data.get("id")}, "truncated": True}
+                payload = json.dumps({"seq": seq, "event": event}, default=str)
+            # Delivered to the listeners, this worker included, when the transaction commits
+            await connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self._channel, "payload": payload})
+        return seq
+
+    async def _listen(self, connected: asyncio.Event):
+        while True:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("Event bus could not connect, retrying")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _connection: lost.set())
+            try:
+                await connection.add_listener(self._channel, self._on_notify)
+                if connected.is_set():
+                    # Reconnected, whatever was published meanwhile did not reach this worker
+                    self._reset()
+                connected.set()
+                await lost.wait()
+                logger.warning("Event bus connection lost, reconnecting")
+            except Exception:
+                # Any failure ends in a reconnect, never in a worker silently without events
+                logger.exception("Event bus listener failed, reconnecting")
+            finally:
+                await self._close(connection)
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    @staticmethod
+    async def _close(connection: asyncpg.Connection):
+        if connection.is_closed():
+            return
+        try:
+            await connection.close(timeout=RECONNECT_DELAY_SECONDS)
+        except Exception:
+            connection.terminate()
+
+    @staticmethod
+    def _listener_done(task: asyncio.Task):
+        if not task.cancelled():
+            logger.error("Event bus listener stopped, this worker no longer receives events", exc_info=task.exception())
+
+    def _on_notify(self, _connection, _pid: int, _channel: str, payload: str):
+        message = json.loads(payload)
+        self._deliver(message["seq"], message["event"])
+
+
+def create_event_bus(backend: str = EVENT_BUS_BACKEND) -> EventBus:
+    if backend == "memory":
+        return InMemoryEventBus()
+    if backend == "postgres":
+        return PostgresEventBus()
+    raise ValueError(f"Unknown event bus backend {backend!r}, expected 'memory' or 'postgres'")
@@ -0,0 +1,79 @@
+"""
+Fast JSON Responses
+
+FastAPI's default path validates a handler's return value against the
+response model, converts it to plain Python with jsonable_encoder and then
+runs json.dumps, all in Python. For large lists that dominates the request.
+
+- FastJSONResponse renders with orjson when it is installed (falling back to
+  the standard library), and is the application's default response class.
+- model_response() serializes response models with a prebuilt pydantic
+  TypeAdapter straight to JSON bytes, skipping jsonable_encoder entirely.
+- Raw dict rows (the database explorer) are returned as FastJSONResponse
+  directly, which converts database types such as Decimal itself.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # Optional, the standard library is used without it
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode the types json/orjson do not handle, the same way jsonable_encoder does."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Integral values stay integers, like fastapi.encoders.decimal_encoder
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, memoryview):
+        return value.tobytes().decode()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(adapter: TypeAdapter, value: Any, response: Response | None = None) -> Response:
+    """
+    Validate value (ORM objects or models) with adapter and serialize it to JSON in one pass.
+
+    Headers set on the endpoint's injected response (pagination cursors,
+    ETag, ...) are carried over, since FastAPI does not merge them into a
+    response returned by the endpoint.
+    """
+    content = adapter.dump_json(adapter.validate_python(value, from_attributes=True), by_alias=True)
+    result = Response(content=content, media_type="application/json")
+    if response is not None:
+        for name, header in response.headers.items():
+            if name != "content-length":
+                result.headers[name] = header
+    return result
@@ -0,0 +1,96 @@
+"""
+Identity Cache
+
+Caches the user looked up on every authenticated request and the ids of
+the "first admin" / "first manager" users that handlers attribute actions
+to, so write paths do not pay for those round-trips on every call.
+
+Entries expire after a TTL and are invalidated explicitly whenever users
+are created, updated or imported. Hits and misses are exposed through the
+metrics registry.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+import metrics
+import models
+
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+
+
+def _detached_copy(user: models.User) -> models.User:
+    """Copy a user's columns into an instance that is not bound to any session."""
+    copy = models.User(
+        id=user.id,
+        full_name=user.full_name,
+        email=user.email,
+        role=user.role,
+        service=user.service,
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+class IdentityCache:
+    def __init__(self, ttl_seconds: float = IDENTITY_CACHE_TTL_SECONDS):
+        self._ttl = ttl_seconds
+        self._users: dict[int, tuple[float, models.User]] = {}
+        self._first_by_role: dict[models.UserRole, tuple[float, int | None]] = {}
+        self._lock = threading.Lock()
+        self._hits = metrics.counter("identity_cache_hits")
+        self._misses = metrics.counter("identity_cache_misses")
+
+    def get_user(self, db: Session, user_id: int) -> models.User | None:
+        """Get a user by id, attached to db so relationships still lazy load."""
+        with self._lock:
+            entry = self._users.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._hits.inc()
+            # load=False attaches the cached state without emitting a SELECT
+            return db.merge(entry[1], load=False)
+
+        self._misses.inc()
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user:
+            with self._lock:
+                self._users[user_id] = (time.monotonic() + self._ttl, _detached_copy(user))
+        return user
+
+    def first_user_id(self, db: Session, role: models.UserRole) -> int | None:
+        """Id of the first user with the given role, or None if there is none."""
+        with self._lock:
+            entry = self._first_by_role.get(role)
+        if entry and entry[0] > time.monotonic():
+            self._hits.inc()
+            return entry[1]
+
+        self._misses.inc()
+        user_id = (
+            db.query(models.User.id)
+            .filter(models.User.role == role)
+            .order_by(models.User.id)
+            .limit(1)
+            .scalar()
+        )
+        with self._lock:
+            self._first_by_role[role] = (time.monotonic() + self._ttl, user_id)
+        return user_id
+
+    def invalidate_user(self, user_id: int):
+        """Drop a user after it changed, along with the role lookups it may affect."""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._first_by_role.clear()
+
+    def invalidate_all(self):
+        with self._lock:
+            self._users.clear()
+            self._first_by_role.clear()
+
+
+# Global identity cache instance
+identity_cache = IdentityCache()
@@ -0,0 +1,283 @@
+"""
+Background Import Jobs
+
+CSV uploads are handed to an import job instead of being processed inside
+the HTTP request. The upload is spooled to a temporary file, the request
+returns a job id straight away, and the parse/upsert runs on a worker
+backend. Progress (rows processed, throughput, errors and ETA) can be
+polled through the job id.
+
+Job state is kept in the import_jobs table, written when the job is queued,
+starts, finishes and once per committed chunk, so a poll answered by any
+worker sees the same progress.
+"""
+
+import enum
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+import bulk_import
+import models
+from database import SessionLocal
+
+# Worker backend used for jobs: "thread" (default) or "inline" (runs in the caller, for tests)
+IMPORT_JOB_BACKEND = os.getenv("IMPORT_JOB_BACKEND", "thread")
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+
+# Number of jobs kept for polling, oldest finished jobs are dropped first
+MAX_TRACKED_JOBS = 200
+
+# Columns of ImportJobRecord saved from an ImportJob
+_STATE_COLUMNS = [
+    "kind", "filename", "status", "total_bytes", "bytes_read", "rows_processed",
+    "added", "updated", "skipped", "errors", "created_at", "started_at", "finished_at",
+]
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+@dataclass
+class ImportJob:
+    """Progress and outcome of one CSV import."""
+
+    id: str
+    kind: str
+    filename: str
+    total_bytes: int
+    status: JobStatus = JobStatus.queued
+    bytes_read: int = 0
+    rows_processed: int = 0
+    added: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.completed, JobStatus.failed)
+
+    def record_progress(self, result: bulk_import.ImportResult):
+        self.rows_processed = result.rows
+        self.added = result.added
+        self.updated = result.updated
+        self.skipped = result.skipped
+
+    def to_record(self) -> dict[str, Any]:
+        def timestamp(value: float | None) -> datetime | None:
+            return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status.value,
+            "total_bytes": self.total_bytes,
+            "bytes_read": self.bytes_read,
+            "rows_processed": self.rows_processed,
+            "added": self.added,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "created_at": timestamp(self.created_at),
+            "started_at": timestamp(self.started_at),
+            "finished_at": timestamp(self.finished_at),
+        }
+
+    @classmethod
+    def from_record(cls, record: models.ImportJobRecord) -> "ImportJob":
+        def seconds(value: datetime | None) -> float | None:
+            return value.timestamp() if value is not None else None
+
+        return cls(
+            id=record.id,
+            kind=record.kind,
+            filename=record.filename,
+            total_bytes=record.total_bytes,
+            status=JobStatus(record.status),
+            bytes_read=record.bytes_read,
+            rows_processed=record.rows_processed,
+            added=record.added,
+            updated=record.updated,
+            skipped=record.skipped,
+            errors=list(record.errors or []),
+            created_at=seconds(record.created_at),
+            started_at=seconds(record.started_at),
+            finished_at=seconds(record.finished_at),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        rows_per_second = self.rows_processed / elapsed if elapsed else 0.0
+
+        # Estimate the remaining time from how fast the file has been consumed so far
+        eta_seconds = None
+        if self.status == JobStatus.running and self.bytes_read and elapsed:
+            bytes_per_second = self.bytes_read / elapsed
+            eta_seconds = round(max(self.total_bytes - self.bytes_read, 0) / bytes_per_second, 1)
+
+        message = None
+        if self.status == JobStatus.completed:
+            message = f"Import complete. Added: {self.added}, Updated: {self.updated}, Skipped: {self.skipped}."
+        elif self.status == JobStatus.failed:
+            message = f"Import failed: {self.errors[-1] if self.errors else 'unknown error'}"
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "status": self.status.value,
+            "message": message,
+            "rows_processed": self.rows_processed,
+            "added": self.added,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(rows_per_second, 1),
+            "eta_seconds": eta_seconds,
+        }
+
+
+class _ProgressReader:
+    """Wraps a binary file and records how many bytes have been read from it."""
+
+    def __init__(self, stream: BinaryIO, job: ImportJob):
+        self._stream = stream
+        self._job = job
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self._job.bytes_read += len(data)
+        return data
+
+
+class ThreadPoolBackend:
+    """Runs jobs on a pool of worker threads, off the event loop."""
+
+    def __init__(self, max_workers: int = IMPORT_JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import-job")
+
+    def submit(self, fn: Callable[[], None]):
+        self._executor.submit(fn)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class InProcessBackend:
+    """Runs jobs synchronously in the submitting thread, so tests can assert on the result directly."""
+
+    def submit(self, fn: Callable[[], None]):
+        fn()
+
+    def shutdown(self):
+        pass
+
+
+class ImportJobQueue:
+    """Queues import jobs on a backend and keeps their state in the import_jobs table."""
+
+    def __init__(self, backend, session_factory=SessionLocal):
+        self._backend = backend
+        self._session_factory = session_factory
+
+    def submit(self, spec: bulk_import.ImportSpec, kind: str, filename: str, stream: BinaryIO) -> ImportJob:
+        """Spool an uploaded file to disk and queue its import."""
+        with tempfile.NamedTemporaryFile(prefix="import-", suffix=".csv", delete=False) as spool:
+            shutil.copyfileobj(stream, spool, bulk_import.READ_CHUNK_SIZE)
+            path = spool.name
+
+        job = ImportJob(id=uuid.uuid4().hex, kind=kind, filename=filename, total_bytes=os.path.getsize(path))
+        self._save(job)
+        self._prune()
+        self._backend.submit(lambda: self._run(job, spec, path))
+        return job
+
+    def get(self, job_id: str) -> ImportJob | None:
+        with self._session_factory() as db:
+            record = db.get(models.ImportJobRecord, job_id)
+            return ImportJob.from_record(record) if record else None
+
+    def recent(self, limit: int = MAX_TRACKED_JOBS) -> list[ImportJob]:
+        with self._session_factory() as db:
+            records = db.scalars(
+                select(models.ImportJobRecord).order_by(models.ImportJobRecord.created_at.desc()).limit(limit)
+            )
+            return [ImportJob.from_record(record) for record in records]
+
+    def shutdown(self):
+        self._backend.shutdown()
+
+    def _save(self, job: ImportJob):
+        """Write the job's current state, one upsert per call."""
+        record = job.to_record()
+        statement = insert(models.ImportJobRecord).values(record)
+        statement = statement.on_conflict_do_update(
+            index_elements=[models.ImportJobRecord.id],
+            set_={column: statement.excluded[column] for column in _STATE_COLUMNS},
+        )
+        with self._session_factory() as db:
+            db.execute(statement)
+            db.commit()
+
+    def _prune(self):
+        table = models.ImportJobRecord
+        keep = select(table.id).order_by(table.created_at.desc()).limit(MAX_TRACKED_JOBS).scalar_subquery()
+        with self._session_factory() as db:
+            db.execute(delete(table).where(
+                table.status.in_([JobStatus.completed.value, JobStatus.failed.value]),
+                table.id.not_in(keep),
+            ))
+            db.commit()
+
+    def _progress(self, job: ImportJob, result: bulk_import.ImportResult):
+        job.record_progress(result)
+        self._save(job)
+
+    def _run(self, job: ImportJob, spec: bulk_import.ImportSpec, path: str):
+        job.status = JobStatus.running
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            with self._session_factory() as db, open(path, "rb") as stream:
+                rows = bulk_import.iter_csv_rows(_ProgressReader(stream, job))
+                bulk_import.run_import(db, spec, rows, on_chunk=lambda result: self._progress(job, result))
+            job.status = JobStatus.completed
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = JobStatus.failed
+        finally:
+            job.finished_at = time.time()
+            os.remove(path)
+            self._save(job)
+
+
+def _create_backend():
+    if IMPORT_JOB_BACKEND == "inline":
+        return InProcessBackend()
+    return ThreadPoolBackend()
+
+
+# Global job queue instance
+job_queue = ImportJobQueue(_create_backend())
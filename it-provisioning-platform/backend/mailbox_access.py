@@ -0,0 +1,88 @@
+"""
+Mailbox Access
+
+The shared mailbox import stores each mailbox's FullAccess users as a
+semicolon-separated string (SharedMailbox.full_access_users). The
+mailbox_access table holds the same memberships one row per (mailbox,
+lowercased email), indexed on the email, so "which mailboxes can this user
+access" is an index lookup instead of a scan splitting every mailbox's
+string.
+
+Rows are derived in SQL from full_access_users: the import re-syncs the
+mailboxes each chunk wrote, in the chunk's transaction, and a migration
+backfilled the mailboxes imported before the table existed. After a manual
+data fix, recompute everything with `python mailbox_access.py rebuild`.
+"""
+
+import sys
+
+from sqlalchemy import delete, func, select, true
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+Access = models.MailboxAccess
+
+# Every (mailbox id, email) pair listed in full_access_users
+_entries = (
+    func.unnest(func.string_to_array(models.SharedMailbox.full_access_users, ";"))
+    .table_valued("value")
+    .render_derived(name="entries")
+    .lateral()
+)
+_email = func.lower(func.trim(_entries.c.value))
+
+
+def _memberships(mailbox_ids: list[int] | None = None):
+    query = (
+        select(models.SharedMailbox.id, _email)
+        .select_from(models.SharedMailbox)
+        .join(_entries, true())
+        .where(_email != "")
+        .distinct()
+    )
+    if mailbox_ids is not None:
+        query = query.where(models.SharedMailbox.id.in_(mailbox_ids))
+    return query
+
+
+def sync(db: Session, mailbox_ids: list[int]):
+    """Replace the access rows of mailbox_ids with those in their current full_access_users, the caller commits."""
+    if not mailbox_ids:
+        return
+    db.execute(delete(Access).where(Access.mailbox_id.in_(mailbox_ids)))
+    db.execute(insert(Access).from_select(["mailbox_id", "user_email"], _memberships(mailbox_ids)))
+
+
+def rebuild(db) -> int:
+    """Recompute every access row, returning the number of rows written.
+
+    Accepts a Session or a Connection, the caller commits.
+    """
+    db.execute(delete(Access))
+    result = db.execute(insert(Access).from_select(["mailbox_id", "user_email"], _memberships()))
+    return result.rowcount
+
+
+def mailboxes_for_email(db: Session, email: str, skip: int = 0, limit: int = 100) -> list[models.SharedMailbox]:
+    """Shared mailboxes whose FullAccess lists email."""
+    return (
+        db.query(models.SharedMailbox)
+        .join(Access, Access.mailbox_id == models.SharedMailbox.id)
+        .filter(Access.user_email == email.strip().lower())
+        .order_by(models.SharedMailbox.display_name, models.SharedMailbox.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("Usage: python mailbox_access.py rebuild")
+    with SessionLocal() as db:
+        rows = rebuild(db)
+        db.commit()
+    print(f"Rebuilt {rows} mailbox access row(s)")
@@ -1,22 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import inspect, text  # Added inspect and text for database exploration
-from pydantic import BaseModel
-from typing import Any
-import models, schemas, crud, auth
-from database import engine, get_db
-# Temporarily disable WebSocket imports to get the API working
-# from ws_manager import manager
+from sqlalchemy import select
+from pydantic import BaseModel, TypeAdapter
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Literal
+import json
+import models, schemas, crud, auth, bulk_import, metrics, pagination, migrations, rollups, etag, exports, db_explorer, query_count, mailbox_access
+from database import engine, async_engine, SessionLocal, get_db, get_async_db, AsyncDB
+from pool_metrics import pool_stats
+from import_jobs import job_queue
+from identity_cache import identity_cache
+from audit import audit_sink
+from ws_manager import manager, parse_topics
+from schema_cache import schema_cache
+from fast_json import FastJSONResponse, model_response
 from models import RequestStatus
-import csv
-import io
 
 # This creates the tables. If they already exist, it does nothing.
 models.Base.metadata.create_all(bind=engine)
+# Apply changes to existing tables (indexes, backfills) that create_all() does not handle
+migrations.run_migrations(engine)
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,22 +32,94 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "ETag", "X-Estimated-Count", "X-Query-Count"],
 )
 
+# Conditional GETs answer 304 from a dependency, before the endpoint runs
+app.add_exception_handler(etag.NotModified, etag.not_modified_handler)
+
+# Count each request's queries against its budget (see query_count.py)
+query_count.instrument(engine, async_engine.sync_engine)
+app.add_middleware(query_count.QueryCountMiddleware)
+app.add_exception_handler(query_count.QueryBudgetExceeded, query_count.budget_exceeded_handler)
+
+# Tables each cached response is built from, a change to any of them changes the ETag
+REQUEST_TABLES = ("requests", "users", "form_definitions", "walkthrough_templates", "temp_accounts")
+FORM_DEFINITION_TABLES = ("form_definitions", "users", "walkthrough_templates")
+
+# Prebuilt serializers for the large list responses (see fast_json.py)
+REQUEST_LIST = TypeAdapter(list[schemas.Request])
+REQUEST_SUMMARY_LIST = TypeAdapter(list[schemas.RequestSummary])
+AUDIT_LOG_LIST = TypeAdapter(list[schemas.AuditLog])
+
+@app.on_event("shutdown")
+def shutdown_import_jobs():
+    # Let running imports finish so their spooled files are consumed and cleaned up
+    job_queue.shutdown()
+
+@app.on_event("shutdown")
+def flush_audit_log():
+    # Write any buffered audit events before the worker exits
+    audit_sink.close()
+
+@app.on_event("startup")
+def load_schema_snapshot():
+    # Reflect every table once so the database explorer does not query the catalog per request
+    schema_cache.refresh()
+
+@app.on_event("startup")
+async def start_event_bus():
+    await manager.start()
+
+@app.on_event("shutdown")
+async def close_websockets():
+    await manager.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "Hello from FastAPI Backend"}
 
-# Temporarily disabled WebSocket endpoint
-# @app.websocket("/ws/admin-dashboard")
-# async def websocket_endpoint(websocket: WebSocket):
-#     await manager.connect(websocket)
-#     try:
-#         while True:
-#             # We don't need to receive data, just keep the connection open
-#             await websocket.receive_text()
-#     except WebSocketDisconnect:
-#         manager.disconnect(websocket)
+def websocket_service_scope(user_id: int) -> str | None:
+    """Service a live connection is limited to, matching the manager filter of read_requests."""
+    with SessionLocal() as db:
+        user = identity_cache.get_user(db, user_id)
+        if not user:
+            raise ValueError("Invalid user ID")
+        if user.role == models.UserRole.manager and user.service is not None:
+            return str(user.service)
+    return None
+
+def request_event(event_type: str, request: schemas.Request, **changes) -> dict:
+    """Dashboard event carrying the request id and the given fields, routed by the submitter's service."""
+    return {
+        "type": event_type,
+        "data": {"id": request.id, **changes},
+        "service": request.submitted_by.service,
+    }
+
+@app.websocket("/ws/admin-dashboard")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    last_seq: int | None = None,  # Reconnecting clients pass the highest sequence number they saw to receive what they missed
+    topics: str | None = None,  # Comma-separated, e.g. "service:IT,event:new_request"; everything when omitted
+    user_id: int | None = None,  # Browsers cannot set the user-id header on a WebSocket
+):
+    try:
+        subscription = parse_topics(topics)
+        service = await run_in_threadpool(websocket_service_scope, user_id) if user_id is not None else None
+    except ValueError as exc:
+        await websocket.close(code=1008, reason=str(exc))
+        return
+
+    await manager.connect(websocket, last_seq, subscription, service)
+    try:
+        while True:
+            # We don't need to receive data, just keep the connection open
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(websocket)
 
 @app.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -58,24 +137,22 @@ def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
 def create_form_definition(form: schemas.FormDefinitionCreate, db: Session = Depends(get_db)):
     # In a real app, you'd get the user_id from an authenticated token.
     # For now, we'll hardcode it to the first admin user.
-    admin_user = db.query(models.User).filter(models.User.role == models.UserRole.admin).first()
-    if not admin_user:
+    admin_id = identity_cache.first_user_id(db, models.UserRole.admin)
+    if admin_id is None:
         raise HTTPException(status_code=404, detail="No admin user found to assign form to.")
     
     try:
-        # Cast to int to satisfy type checker - at runtime this will be an int
-        user_id: int = admin_user.id  # type: ignore
-        return crud.create_form_definition(db=db, form=form, user_id=user_id)
+        return crud.create_form_definition(db=db, form=form, user_id=admin_id)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Form with this name already exists")
 
-@app.get("/form-definitions/", response_model=list[schemas.FormDefinition])
+@app.get("/form-definitions/", response_model=list[schemas.FormDefinition], dependencies=[etag.conditional_get(*FORM_DEFINITION_TABLES)])
 def read_form_definitions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     forms = crud.get_form_definitions(db, skip=skip, limit=limit)
     return forms
 
-@app.get("/form-definitions/{form_id}", response_model=schemas.FormDefinition)
+@app.get("/form-definitions/{form_id}", response_model=schemas.FormDefinition, dependencies=[etag.conditional_get(*FORM_DEFINITION_TABLES)])
 def read_form_definition(form_id: int, db: Session = Depends(get_db)):
     form = crud.get_form_definition(db, form_id)
     if form is None:
@@ -83,37 +160,68 @@ def read_form_definition(form_id: int, db: Session = Depends(get_db)):
     return form
 
 @app.post("/requests/", response_model=schemas.Request)
-async def create_request(request: schemas.RequestCreate, db: Session = Depends(get_db)):
-    # In a real app, you'd get the user_id from an authenticated token.
-    # For now, we'll hardcode it to the first manager user.
-    manager_user = db.query(models.User).filter(models.User.role == models.UserRole.manager).first()
-    if not manager_user:
-        raise HTTPException(status_code=404, detail="No manager user found to submit request.")
-    user_id: int = manager_user.id  # type: ignore
+async def create_request(request: schemas.RequestCreate, db: AsyncDB = Depends(get_async_db)):
+    def submit(session: Session) -> schemas.Request:
+        # In a real app, you'd get the user_id from an authenticated token.
+        # For now, we'll hardcode it to the first manager user.
+        manager_id = identity_cache.first_user_id(session, models.UserRole.manager)
+        if manager_id is None:
+            raise HTTPException(status_code=404, detail="No manager user found to submit request.")
+
+        db_request = crud.create_request(db=session, request=request, user_id=manager_id)
+        return schemas.Request.model_validate(db_request)
+
+    db_request = await db.run(submit)
     
-    db_request = crud.create_request(db=db, request=request, user_id=user_id)
-    
-    # Temporarily disabled WebSocket broadcast
-    # await manager.broadcast({
-    #     "type": "new_request",
-    #     "data": {
-    #         "id": db_request.id,
-    #         "status": db_request.status.value,
-    #         "submitted_by_manager_id": db_request.submitted_by_manager_id,
-    #         "form_definition_id": db_request.form_definition_id,
-    #         "form_data": db_request.form_data
-    #     }
-    # })
+    await manager.broadcast(request_event(
+        "new_request",
+        db_request,
+        status=db_request.status,
+        form_definition_id=db_request.form_definition_id,
+        submitted_by_manager_id=db_request.submitted_by.id,
+    ))
     
     return db_request
 
-@app.get("/requests/", response_model=list[schemas.Request])
+def parse_json_filter(name: str, value: str | None) -> dict | None:
+    """Parse a JSON object passed as a query parameter for a JSONB containment filter."""
+    if not value:
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = None
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a JSON object")
+    return parsed
+
+def parse_list_param(name: str, value: str | None, allowed) -> list[str]:
+    """Parse a comma-separated query parameter whose items must be keys of allowed."""
+    items = [item.strip() for item in (value or "").split(",") if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {name}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    return items
+
+@app.get(
+    "/requests/",
+    response_model=list[schemas.Request] | list[schemas.RequestSummary],
+    dependencies=[etag.conditional_get(*REQUEST_TABLES)],
+)
 def read_requests(
+    response: Response,
     user: models.User | None = Depends(auth.get_optional_user), # Use auth to get the current user
     skip: int = 0, 
     limit: int = 100, 
+    cursor: str | None = None,  # Opaque cursor from X-Next-Cursor/X-Prev-Cursor, switches to keyset paging
+    form_data: str | None = None,  # JSON object the request's form_data must contain
+    view: Literal["full", "summary"] = "full",  # "summary" returns RequestSummary rows without the JSONB documents
     db: Session = Depends(get_db)
 ):
+    form_data_filter = parse_json_filter("form_data", form_data)
     service_filter: str | None = None
     # If the user is a manager, filter by their service
     if user and user.role.value == 'manager':
@@ -124,58 +232,99 @@ def read_requests(
         
     # If the user is an admin or unlogged, service_filter remains None, so they see all requests
     
-    requests = crud.get_requests(db, skip=skip, limit=limit, service=service_filter)
-    return requests
+    if view == "summary":
+        if cursor:
+            page = crud.get_request_summaries_page(db, pagination.decode_cursor(cursor), limit=limit, service=service_filter, form_data=form_data_filter)
+        else:
+            rows = crud.get_request_summaries(db, skip=skip, limit=limit, service=service_filter, form_data=form_data_filter)
+            page = pagination.offset_page(rows, skip, limit)
+        page.set_headers(response)
+        return model_response(REQUEST_SUMMARY_LIST, [crud.request_summary(row) for row in page.items], response)
+
+    if cursor:
+        page = crud.get_requests_page(db, pagination.decode_cursor(cursor), limit=limit, service=service_filter, form_data=form_data_filter)
+    else:
+        requests = crud.get_requests(db, skip=skip, limit=limit, service=service_filter, form_data=form_data_filter)
+        page = pagination.offset_page(requests, skip, limit)
+    page.set_headers(response)
+    return model_response(REQUEST_LIST, page.items, response)
 
 # Add the status update endpoint
 @app.put("/requests/{request_id}/status", response_model=schemas.Request)
 async def update_request_status(
     request_id: int, 
     status: RequestStatus, 
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    db_request = db.query(models.Request).filter(models.Request.id == request_id).first()
-    if not db_request:
-        raise HTTPException(status_code=404, detail="Request not found")
-    
-    # Store original status for audit log
-    original_status = db_request.status.value
-    
-    # Update the status
-    db_request.status = status  # type: ignore
-    db.commit()
-    db.refresh(db_request)
+    def apply(session: Session) -> schemas.Request:
+        # Lock the row so concurrent changes see each other's status and move the rollups once each
+        db_request = session.query(models.Request).filter(models.Request.id == request_id).with_for_update().first()
+        if not db_request:
+            raise HTTPException(status_code=404, detail="Request not found")
+
+        # Store original status for audit log
+        original_status = db_request.status.value
+
+        # Update the status, moving the request between rollup rows in the same transaction
+        rollups.record_status_change(session, request_id, db_request.status, status)
+        db_request.status = status  # type: ignore
+        session.commit()
+        session.refresh(db_request)
+
+        # Create audit log entry
+        admin_id = identity_cache.first_user_id(session, models.UserRole.admin)
+        if admin_id is not None:
+            crud.create_audit_log(
+                db=session,
+                actor_id=admin_id,
+                event_type="REQUEST_STATUS_CHANGED",
+                details={
+                    "request_id": request_id,
+                    "from_status": original_status,
+                    "to_status": status.value
+                }
+            )
+        return schemas.Request.model_validate(db_request)
 
-    # Create audit log entry
-    admin_user = db.query(models.User).filter(models.User.role == models.UserRole.admin).first()
-    if admin_user:
-        actor_id = admin_user.id  # Get the actual value
-        crud.create_audit_log(
-            db=db,
-            actor_id=actor_id,  # type: ignore
-            event_type="REQUEST_STATUS_CHANGED",
-            details={
-                "request_id": request_id,
-                "from_status": original_status,
-                "to_status": status.value
-            }
-        )
+    db_request = await db.run(apply)
 
-    # Temporarily disabled WebSocket broadcast
-    # await manager.broadcast({
-    #     "type": "status_update",
-    #     "data": {"id": request_id, "status": status.value}
-    # })
+    await manager.broadcast(request_event("status_update", db_request, status=status.value))
 
     return db_request
 
 # Get a specific request by ID
-@app.get("/requests/{request_id}", response_model=schemas.Request)
-def read_request(request_id: int, db: Session = Depends(get_db)):
-    db_request = crud.get_request(db, request_id)
-    if db_request is None:
+@app.get(
+    "/requests/{request_id}",
+    response_model=None,  # A schemas.Request, a schemas.RequestSummary, or the fields/expand subset of a request
+    responses={200: {"model": schemas.Request}},
+    dependencies=[etag.conditional_get(*REQUEST_TABLES)],
+)
+def read_request(
+    request_id: int,
+    fields: str | None = None,  # Comma-separated columns, e.g. "id,status,form_data"
+    expand: str | None = None,  # Comma-separated related objects, e.g. "submitted_by,form_definition"
+    view: Literal["full", "summary"] = "full",  # "summary" returns the RequestSummary row of GET /requests/?view=summary
+    db: Session = Depends(get_db)
+):
+    if view == "summary":
+        summary = crud.get_request_summary(db, request_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Request not found")
+        return summary
+
+    if fields is None and expand is None:
+        db_request = crud.get_request(db, request_id)
+        if db_request is None:
+            raise HTTPException(status_code=404, detail="Request not found")
+        return schemas.Request.model_validate(db_request)
+
+    # Partial view: only the asked for columns and related objects are loaded and returned
+    field_list = parse_list_param("fields", fields, crud.REQUEST_FIELDS)
+    expand_list = parse_list_param("expand", expand, crud.REQUEST_EXPANSIONS)
+    projection = crud.get_request_projection(db, request_id, field_list, expand_list)
+    if projection is None:
         raise HTTPException(status_code=404, detail="Request not found")
-    return db_request
+    return projection
 
 # Schema for walkthrough state updates
 class WalkthroughStateUpdate(BaseModel):
@@ -201,6 +350,25 @@ def update_walkthrough_state(
 class TempAccountAssign(BaseModel):
     temp_account_id: int
 
+def record_temp_account_assignment(db: Session, db_request: models.Request, account: models.TempAccount):
+    """Point the request at a claimed temp account and audit it, in the same transaction."""
+    db_request.assigned_temp_account_id = account.id  # type: ignore
+
+    # Log this as an audit event, in the same transaction as the assignment
+    admin_id = identity_cache.first_user_id(db, models.UserRole.admin)
+    if admin_id is not None:
+        crud.create_audit_log(
+            db=db,
+            actor_id=admin_id,
+            event_type="TEMP_ACCOUNT_ASSIGNED",
+            details={
+                "request_id": db_request.id, 
+                "temp_account_id": account.id,
+                "account_upn": account.user_principal_name
+            },
+            strict=True
+        )
+
 # Assign temp account to a request
 @app.post("/requests/{request_id}/assign-temp-account", response_model=schemas.Request)
 def assign_temp_account(
@@ -208,36 +376,41 @@ def assign_temp_account(
     assignment: TempAccountAssign,
     db: Session = Depends(get_db)
 ):
-    # Get the request
-    db_request = db.query(models.Request).filter(models.Request.id == request_id).first()
+    # Lock the request so concurrent assignments to it cannot each take an account
+    db_request = db.query(models.Request).filter(models.Request.id == request_id).with_for_update().first()
     if not db_request:
         raise HTTPException(status_code=404, detail="Request not found")
+    if db_request.assigned_temp_account_id is not None:
+        raise HTTPException(status_code=400, detail="Request already has a temp account")
 
-    # Get the temp account and ensure it's available
-    db_temp_account = db.query(models.TempAccount).filter(models.TempAccount.id == assignment.temp_account_id).first()
+    # Claim the account only if it is still free, in one conditional UPDATE
+    db_temp_account = crud.claim_temp_account(db, assignment.temp_account_id)
     if not db_temp_account:
-        raise HTTPException(status_code=404, detail="Temp account not found")
-    if db_temp_account.is_in_use:  # type: ignore
+        if not db.get(models.TempAccount, assignment.temp_account_id):
+            raise HTTPException(status_code=404, detail="Temp account not found")
         raise HTTPException(status_code=400, detail="Temp account is already in use")
 
-    # Perform the assignment
-    db_temp_account.is_in_use = True  # type: ignore
-    db_request.assigned_temp_account_id = db_temp_account.id  # type: ignore
-    
-    # Log this as an audit event
-    admin_user = db.query(models.User).filter(models.User.role == models.UserRole.admin).first()
-    if admin_user:
-        crud.create_audit_log(
-            db=db,
-            actor_id=admin_user.id,  # type: ignore
-            event_type="TEMP_ACCOUNT_ASSIGNED",
-            details={
-                "request_id": request_id, 
-                "temp_account_id": db_temp_account.id,
-                "account_upn": db_temp_account.user_principal_name
-            }
-        )
+    record_temp_account_assignment(db, db_request, db_temp_account)
+    db.commit()
+    db.refresh(db_request)
+    return db_request
+
+# Assign the next free temp account to a request
+@app.post("/requests/{request_id}/claim-temp-account", response_model=schemas.Request)
+def claim_temp_account(request_id: int, db: Session = Depends(get_db)):
+    """Claim a free temp account for a request, safe against concurrent claims."""
+    # Lock the request so concurrent claims for it cannot each take an account
+    db_request = db.query(models.Request).filter(models.Request.id == request_id).with_for_update().first()
+    if not db_request:
+        raise HTTPException(status_code=404, detail="Request not found")
+    if db_request.assigned_temp_account_id is not None:
+        raise HTTPException(status_code=400, detail="Request already has a temp account")
 
+    db_temp_account = crud.claim_temp_account(db)
+    if not db_temp_account:
+        raise HTTPException(status_code=409, detail="No free temp account available")
+
+    record_temp_account_assignment(db, db_request, db_temp_account)
     db.commit()
     db.refresh(db_request)
     return db_request
@@ -248,48 +421,14 @@ def get_temp_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get
     accounts = crud.get_temp_accounts(db, skip=skip, limit=limit)
     return accounts
 
-@app.post("/admin/upload-temp-accounts-csv")
-async def upload_temp_accounts_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@app.post("/admin/upload-temp-accounts-csv", status_code=202)
+def upload_temp_accounts_csv(file: UploadFile = File(...)):
     if not file.filename or not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
 
-    try:
-        # Read CSV content
-        contents = await file.read()
-        # Decode and read as a file-like object
-        stream = io.StringIO(contents.decode("utf-8"))
-        reader = csv.DictReader(stream)
-
-        synced_count = 0
-        updated_count = 0
-
-        for row in reader:
-            # Assumes CSV has 'displayName' and 'userPrincipalName' headers
-            upn = row.get("userPrincipalName")
-            display_name = row.get("displayName")
-
-            if not upn or not display_name:
-                continue
-
-            # Basic upsert logic
-            account = crud.get_temp_account_by_upn(db, upn)
-            if account:
-                # Update existing account if needed
-                setattr(account, 'display_name', display_name)
-                updated_count += 1
-            else:
-                # Create new account
-                account_data = schemas.TempAccountCreate(
-                    user_principal_name=upn,
-                    display_name=display_name
-                )
-                crud.create_temp_account(db, account_data)
-                synced_count += 1
-        
-        db.commit()
-        return {"message": f"Sync complete. Added: {synced_count}, Updated: {updated_count}."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing file: {e}")
+    # Assumes CSV has 'displayName' and 'userPrincipalName' headers
+    job = job_queue.submit(bulk_import.TEMP_ACCOUNTS, "temp_accounts", file.filename, file.file)
+    return {"message": "Import queued.", "job_id": job.id, "status": job.status.value}
 
 @app.put("/admin/temp-accounts/{account_id}/status", response_model=dict)
 def update_temp_account_status(
@@ -324,12 +463,11 @@ def update_temp_account_status(
     # Create audit log entry
     # In a real app, actor_id would come from an authenticated session.
     # We'll hardcode to the first admin for now.
-    admin_user = db.query(models.User).filter(models.User.role == models.UserRole.admin).first()
-    if admin_user:
-        actor_id = admin_user.id  # Get the actual value
+    admin_id = identity_cache.first_user_id(db, models.UserRole.admin)
+    if admin_id is not None:
         crud.create_audit_log(
             db=db,
-            actor_id=actor_id,  # type: ignore
+            actor_id=admin_id,
             event_type="TEMP_ACCOUNT_STATUS_CHANGED",
             details={
                 "account_id": account_id,
@@ -356,9 +494,23 @@ def update_temp_account_status(
 
 # Audit Log API endpoint
 @app.get("/admin/audit-log", response_model=list[schemas.AuditLog])
-def read_audit_log(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    logs = crud.get_audit_logs(db, skip=skip, limit=limit)
-    return logs
+def read_audit_log(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,  # Opaque cursor from X-Next-Cursor/X-Prev-Cursor, switches to keyset paging
+    event_type: str | None = None,
+    details: str | None = None,  # JSON object the event details must contain
+    db: Session = Depends(get_db)
+):
+    details_filter = parse_json_filter("details", details)
+    if cursor:
+        page = crud.get_audit_logs_page(db, pagination.decode_cursor(cursor), limit=limit, event_type=event_type, details=details_filter)
+    else:
+        logs = crud.get_audit_logs(db, skip=skip, limit=limit, event_type=event_type, details=details_filter)
+        page = pagination.offset_page(logs, skip, limit)
+    page.set_headers(response)
+    return model_response(AUDIT_LOG_LIST, page.items, response)
 
 # Walkthrough Template endpoints
 @app.post("/admin/walkthrough-templates", response_model=schemas.WalkthroughTemplate)
@@ -368,12 +520,12 @@ def create_walkthrough_template(
 ):
     return crud.create_walkthrough_template(db=db, template=template)
 
-@app.get("/admin/walkthrough-templates", response_model=list[schemas.WalkthroughTemplate])
+@app.get("/admin/walkthrough-templates", response_model=list[schemas.WalkthroughTemplate], dependencies=[etag.conditional_get("walkthrough_templates")])
 def read_walkthrough_templates(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     templates = crud.get_walkthrough_templates(db, skip=skip, limit=limit)
     return templates
 
-@app.get("/admin/walkthrough-templates/{template_id}", response_model=schemas.WalkthroughTemplate)
+@app.get("/admin/walkthrough-templates/{template_id}", response_model=schemas.WalkthroughTemplate, dependencies=[etag.conditional_get("walkthrough_templates")])
 def read_walkthrough_template(template_id: int, db: Session = Depends(get_db)):
     template = crud.get_walkthrough_template(db, template_id=template_id)
     if template is None:
@@ -410,6 +562,19 @@ def get_status_breakdown(db: Session = Depends(get_db)):
     status_data = crud.get_request_status_breakdown(db)
     return [{"status": str(row.status), "count": row.count} for row in status_data]
 
+@app.get("/analytics/service-breakdown")
+def get_service_breakdown(db: Session = Depends(get_db)):
+    service_data = crud.get_request_service_breakdown(db)
+    return [{"service": row.service or None, "count": row.count} for row in service_data]
+
+@app.get("/analytics/form-breakdown")
+def get_form_breakdown(db: Session = Depends(get_db)):
+    form_data = crud.get_request_form_breakdown(db)
+    return [
+        {"form_definition_id": row.form_definition_id or None, "form_name": row.form_name, "count": row.count}
+        for row in form_data
+    ]
+
 # New User Creation endpoint
 @app.post("/admin/generate-new-user-command", response_model=dict)
 def generate_new_user_command(user_data: schemas.NewADUser):
@@ -435,77 +600,63 @@ def generate_new_user_command(user_data: schemas.NewADUser):
     
     return {"powershell_command": command}
 
-@app.post("/admin/upload-ad-users-csv")
-async def upload_ad_users_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@app.post("/admin/upload-ad-users-csv", status_code=202)
+def upload_ad_users_csv(file: UploadFile = File(...)):
     """
-    Upload and process AD Users CSV to populate the users table.
+    Queue an import of an AD Users CSV to populate the users table.
     Expected CSV columns: DisplayName, EmailAddress
     """
-    contents = await file.read()
-    stream = io.StringIO(contents.decode("utf-8"))
-    reader = csv.DictReader(stream)
-    
-    new_count = 0
-    for row in reader:
-        email = row.get("EmailAddress")
-        display_name = row.get("DisplayName")
-        
-        # Skip rows without required fields
-        if not email or not display_name:
-            continue
-            
-        # Check if user already exists
-        user = crud.get_user_by_email(db, email=email)
-        if not user:
-            # Create a user with a default role
-            user_schema = schemas.UserCreate(
-                full_name=display_name,
-                email=email,
-                role=models.UserRole.manager  # Assign a default role
-            )
-            crud.create_user(db=db, user=user_schema)
-            new_count += 1
+    job = job_queue.submit(bulk_import.AD_USERS, "ad_users", file.filename or "upload.csv", file.file)
+    return {"message": "Import queued.", "job_id": job.id, "status": job.status.value}
 
-    return {"message": f"Processed AD Users. Added {new_count} new users."}
-
-@app.post("/admin/upload-shared-mailboxes-csv")
-async def upload_shared_mailboxes_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@app.post("/admin/upload-shared-mailboxes-csv", status_code=202)
+def upload_shared_mailboxes_csv(file: UploadFile = File(...)):
     """
-    Upload and process Shared Mailboxes CSV to populate the shared_mailboxes table.
+    Queue an import of a Shared Mailboxes CSV to populate the shared_mailboxes table.
     Expected CSV columns: DisplayName, PrimarySmtpAddress, FullAccess
     """
-    contents = await file.read()
-    stream = io.StringIO(contents.decode("utf-8"))
-    reader = csv.DictReader(stream)
-    
-    new_count = 0
-    for row in reader:
-        primary_smtp = row.get("PrimarySmtpAddress")
-        display_name = row.get("DisplayName")
-        
-        # Skip rows without required fields
-        if not primary_smtp or not display_name:
-            continue
-            
-        # Basic upsert logic for shared mailboxes
-        mailbox = db.query(models.SharedMailbox).filter_by(primary_smtp_address=primary_smtp).first()
-        if not mailbox:
-            db_mailbox = models.SharedMailbox(
-                display_name=display_name,
-                primary_smtp_address=primary_smtp,
-                full_access_users=row.get("FullAccess", "")
-            )
-            db.add(db_mailbox)
-            new_count += 1
-    db.commit()
-    return {"message": f"Processed Shared Mailboxes. Added {new_count} new mailboxes."}
+    job = job_queue.submit(bulk_import.SHARED_MAILBOXES, "shared_mailboxes", file.filename or "upload.csv", file.file)
+    return {"message": "Import queued.", "job_id": job.id, "status": job.status.value}
+
+# Import job progress endpoints
+@app.get("/admin/jobs")
+def read_import_jobs():
+    """List recent import jobs, newest first."""
+    return [job.as_dict() for job in job_queue.recent()]
+
+@app.get("/admin/jobs/{job_id}")
+def read_import_job(job_id: str):
+    """Report progress of an import job: rows processed, throughput, errors and ETA."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.as_dict()
 
 # Endpoint to view shared mailboxes
-@app.get("/shared-mailboxes", response_model=list[schemas.SharedMailbox])
+@app.get("/shared-mailboxes", response_model=list[schemas.SharedMailbox], dependencies=[etag.conditional_get("shared_mailboxes")])
 def read_shared_mailboxes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     mailboxes = db.query(models.SharedMailbox).offset(skip).limit(limit).all()
     return mailboxes
 
+# Reverse lookup of the FullAccess column: which mailboxes can this user access
+@app.get("/shared-mailboxes/full-access", response_model=list[schemas.SharedMailbox], dependencies=[Depends(auth.require_admin)])
+def read_full_access_mailboxes(
+    email: str | None = None,
+    user_id: int | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+):
+    """Get the shared mailboxes whose FullAccess lists a user, given by email or user_id."""
+    if (email is None) == (user_id is None):
+        raise HTTPException(status_code=400, detail="Pass exactly one of 'email' or 'user_id'")
+    if user_id is not None:
+        user = identity_cache.get_user(db, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        email = user.email
+    return mailbox_access.mailboxes_for_email(db, email, skip=skip, limit=limit)
+
 # =======================
 # AUTHENTICATION & RBAC ENDPOINTS
 # =======================
@@ -514,7 +665,7 @@ def read_shared_mailboxes(skip: int = 0, limit: int = 100, db: Session = Depends
 @app.get("/users/{user_id}", response_model=schemas.User)
 def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
     """Get user details by ID for session management."""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = identity_cache.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -526,6 +677,13 @@ def get_manager_mailboxes(current_user: models.User = Depends(auth.require_manag
     # If manager has no specific permissions, return empty list
     return current_user.visible_mailboxes
 
+def get_manager_and_mailbox(db: Session, manager_id: int, mailbox_id: int) -> tuple[models.User, models.SharedMailbox]:
+    manager = db.get(models.User, manager_id)
+    mailbox = db.get(models.SharedMailbox, mailbox_id)
+    if not manager or not mailbox:
+        raise HTTPException(status_code=404, detail="Manager or Mailbox not found")
+    return manager, mailbox
+
 # Admin endpoint to grant mailbox visibility to manager
 @app.post("/admin/permissions/mailbox-to-manager")
 def grant_mailbox_visibility(
@@ -535,21 +693,16 @@ def grant_mailbox_visibility(
     db: Session = Depends(get_db)
 ):
     """Allow an admin to grant a manager visibility to a specific shared mailbox."""
-    manager = db.query(models.User).filter(models.User.id == manager_id).first()
-    mailbox = db.query(models.SharedMailbox).filter(models.SharedMailbox.id == mailbox_id).first()
-
-    if not manager or not mailbox:
-        raise HTTPException(status_code=404, detail="Manager or Mailbox not found")
+    manager, mailbox = get_manager_and_mailbox(db, manager_id, mailbox_id)
     if manager.role.value != 'manager':
         raise HTTPException(status_code=400, detail="User is not a manager")
 
-    # Check if permission already exists
-    if mailbox in manager.visible_mailboxes:
+    # The insert reports whether the permission already existed, without loading the manager's mailboxes
+    if not crud.grant_mailbox_permissions(db, [(manager_id, mailbox_id)]):
         raise HTTPException(status_code=400, detail="Manager already has access to this mailbox")
-
-    manager.visible_mailboxes.append(mailbox)
+    message = f"Manager {manager.full_name} can now see mailbox {mailbox.display_name}"
     db.commit()
-    return {"message": f"Manager {manager.full_name} can now see mailbox {mailbox.display_name}"}
+    return {"message": message}
 
 # Admin endpoint to revoke mailbox visibility from manager
 @app.delete("/admin/permissions/mailbox-to-manager")
@@ -560,43 +713,42 @@ def revoke_mailbox_visibility(
     db: Session = Depends(get_db)
 ):
     """Allow an admin to revoke a manager's visibility to a specific shared mailbox."""
-    manager = db.query(models.User).filter(models.User.id == manager_id).first()
-    mailbox = db.query(models.SharedMailbox).filter(models.SharedMailbox.id == mailbox_id).first()
+    manager, mailbox = get_manager_and_mailbox(db, manager_id, mailbox_id)
 
-    if not manager or not mailbox:
-        raise HTTPException(status_code=404, detail="Manager or Mailbox not found")
-
-    # Check if permission exists
-    if mailbox not in manager.visible_mailboxes:
+    if not crud.revoke_mailbox_permissions(db, [(manager_id, mailbox_id)]):
         raise HTTPException(status_code=400, detail="Manager does not have access to this mailbox")
-
-    manager.visible_mailboxes.remove(mailbox)
+    message = f"Manager {manager.full_name} can no longer see mailbox {mailbox.display_name}"
     db.commit()
-    return {"message": f"Manager {manager.full_name} can no longer see mailbox {mailbox.display_name}"}
+    return {"message": message}
+
+# Admin endpoint to grant and revoke many mailbox permissions at once
+@app.post("/admin/permissions/mailbox-to-manager/batch", response_model=list[schemas.MailboxPermissionResult])
+def apply_mailbox_permissions(
+    batch: schemas.MailboxPermissionBatch,
+    current_admin: models.User = Depends(auth.require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply grants, revokes and desired mailbox sets per manager (replace) in one
+    transaction, with a result for every (manager, mailbox) pair.
+    """
+    try:
+        return crud.apply_mailbox_permissions(db, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Get all manager-mailbox permissions (for admin interface)
-@app.get("/admin/permissions/manager-mailboxes")
+@app.get("/admin/permissions/manager-mailboxes", dependencies=[query_count.budget(2)])
 def get_all_manager_permissions(
+    skip: int = 0,
+    limit: int = 100,
+    manager: str | None = None,
+    mailbox: str | None = None,
     current_admin: models.User = Depends(auth.require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get all manager-mailbox permission mappings for admin interface."""
-    managers = db.query(models.User).filter(models.User.role == models.UserRole.manager).all()
-    permissions = []
-    for manager in managers:
-        permissions.append({
-            "manager_id": manager.id,
-            "manager_name": manager.full_name,
-            "visible_mailboxes": [
-                {
-                    "id": mailbox.id,
-                    "display_name": mailbox.display_name,
-                    "primary_smtp_address": mailbox.primary_smtp_address
-                }
-                for mailbox in manager.visible_mailboxes
-            ]
-        })
-    return permissions
+    """Get a page of manager-mailbox permission mappings for admin interface, optionally searched by manager or mailbox."""
+    return crud.get_manager_permissions(db, skip=skip, limit=limit, manager=manager, mailbox=mailbox)
 
 # Manager endpoint to get their assigned mailboxes for management
 @app.get("/manager/mailboxes", response_model=list[schemas.SharedMailbox])
@@ -612,89 +764,160 @@ def get_manager_assigned_mailboxes(
 async def create_mailbox_modification_request(
     request_data: schemas.MailboxModificationRequest,
     current_manager: models.User = Depends(auth.require_manager),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """Allow a manager to submit a batch of mailbox modifications as a request."""
-    
-    # Validate that all mailboxes belong to this manager
-    for modification in request_data.modifications:
-        mailbox = db.query(models.SharedMailbox).filter(
-            models.SharedMailbox.id == modification.mailbox_id
-        ).first()
-        
-        if not mailbox:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Mailbox with ID {modification.mailbox_id} not found"
-            )
-        
-        if mailbox not in current_manager.managed_mailboxes:
+    manager_id: int = current_manager.id  # type: ignore
+
+    def submit(session: Session) -> schemas.Request:
+        # Validate that all mailboxes belong to this manager, reporting every violation at once
+        missing, forbidden = crud.get_mailbox_violations(
+            session, manager_id, [modification.mailbox_id for modification in request_data.modifications]
+        )
+        if forbidden:
+            problems = [f"You do not have permission to manage mailbox {', '.join(forbidden)}"]
+            problems += [f"Mailbox with ID {mailbox_id} not found" for mailbox_id in missing]
+            raise HTTPException(status_code=403, detail="; ".join(problems))
+        if missing:
             raise HTTPException(
-                status_code=403, 
-                detail=f"You do not have permission to manage mailbox {mailbox.display_name}"
+                status_code=404,
+                detail="; ".join(f"Mailbox with ID {mailbox_id} not found" for mailbox_id in missing)
             )
+
+        # Create a new request with special mailbox modification form_data
+        db_request = models.Request(
+            submitted_by_manager_id=manager_id,
+            form_data={
+                "type": "mailbox_modifications",
+                "modifications": request_data.model_dump()["modifications"]
+            },
+            status=models.RequestStatus.pending,
+            form_definition_id=1  # We'll use a default form_definition_id for mailbox modifications
+        )
+        session.add(db_request)
+        session.flush()
+        rollups.record_created(session, db_request)
+        session.commit()
+        session.refresh(db_request)
+        return schemas.Request.model_validate(db_request)
+
+    db_request = await db.run(submit)
     
-    # Create a new request with special mailbox modification form_data
-    db_request = models.Request(
-        submitted_by_manager_id=current_manager.id,
-        form_data={
-            "type": "mailbox_modifications",
-            "modifications": request_data.model_dump()["modifications"]
-        },
-        status=models.RequestStatus.pending,
-        form_definition_id=1  # We'll use a default form_definition_id for mailbox modifications
-    )
-    db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    
-    # Temporarily disabled WebSocket broadcast
-    # await manager.broadcast({
-    #     "type": "new_request",
-    #     "data": {
-    #         "id": db_request.id,
-    #         "status": db_request.status.value,
-    #         "timestamp": db_request.timestamp.isoformat(),
-    #         "submitted_by_manager_id": db_request.submitted_by_manager_id,
-    #         "form_data": db_request.form_data,
-    #         "type": "mailbox_modifications"
-    #     }
-    # })
+    await manager.broadcast(request_event(
+        "new_request",
+        db_request,
+        status=db_request.status,
+        form_definition_id=db_request.form_definition_id,
+        submitted_by_manager_id=db_request.submitted_by.id,
+    ))
     
     return db_request
 
+# ===========================
+# METRICS ENDPOINTS
+# ===========================
+
+@app.get("/admin/metrics", dependencies=[Depends(auth.require_admin)])
+def read_metrics():
+    """Get the in-process counters and histograms of this worker."""
+    return metrics.snapshot()
+
+@app.get("/admin/metrics/pool", dependencies=[Depends(auth.require_admin)])
+def read_pool_metrics():
+    """Get live connection pool state (checked out, overflow, wait times) for both engines."""
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+    }
+
+@app.get("/admin/metrics/websockets", dependencies=[Depends(auth.require_admin)])
+def read_websocket_metrics():
+    """Get the live dashboard connections of this worker and their send queue depth."""
+    return manager.stats()
+
+# ===========================
+# EXPORT ENDPOINTS
+# ===========================
+
+@app.get("/admin/export/requests", dependencies=[Depends(auth.require_admin)])
+def export_requests(format: str = "csv"):
+    """Stream every request as CSV or NDJSON, oldest first, with the submitter and form name."""
+    statement = (
+        select(
+            models.Request.__table__,
+            models.User.email.label("submitted_by_email"),
+            models.User.service.label("submitted_by_service"),
+            models.FormDefinition.name.label("form_name"),
+        )
+        .outerjoin(models.User, models.Request.submitted_by_manager_id == models.User.id)
+        .outerjoin(models.FormDefinition, models.Request.form_definition_id == models.FormDefinition.id)
+        .order_by(models.Request.timestamp, models.Request.id)
+    )
+    return exports.stream_export(statement, "requests", format)
+
+@app.get("/admin/export/audit-log", dependencies=[Depends(auth.require_admin)])
+def export_audit_log(format: str = "csv", event_type: str | None = None):
+    """Stream the audit log as CSV or NDJSON, oldest first, with the actor's email."""
+    statement = (
+        select(models.AuditLog.__table__, models.User.email.label("actor_email"))
+        .outerjoin(models.User, models.AuditLog.actor_id == models.User.id)
+        .order_by(models.AuditLog.timestamp, models.AuditLog.id)
+    )
+    if event_type:
+        statement = statement.where(models.AuditLog.event_type == event_type)
+    return exports.stream_export(statement, "audit_log", format)
+
+@app.get("/admin/export/tables/{table_name}", dependencies=[Depends(auth.require_admin)])
+def export_table(table_name: str, format: str = "csv"):
+    """Stream a whole database table as CSV or NDJSON, in primary key order."""
+    return exports.stream_export(exports.table_statement(table_name), table_name, format)
+
 # ===========================
 # DATABASE EXPLORER ENDPOINTS
 # ===========================
 
 @app.get("/admin/db/tables", response_model=list[str], dependencies=[Depends(auth.require_admin)])
-def get_table_names(db: Session = Depends(get_db)):
+def get_table_names():
     """Get a list of all table names in the database for admin exploration."""
-    inspector = inspect(db.get_bind())
-    return inspector.get_table_names()
+    return schema_cache.table_names()
+
+@app.post("/admin/db/schema/refresh", dependencies=[Depends(auth.require_admin)])
+def refresh_schema_cache():
+    """Reflect the database schema again, e.g. after a migration added a table."""
+    schema_cache.refresh()
+    return schema_cache.stats()
+
+@app.get("/admin/db/tables/{table_name}/info", dependencies=[Depends(auth.require_admin)])
+def get_table_info(table_name: str, db: Session = Depends(get_db)):
+    """Columns, primary key and estimated row count of a table."""
+    return db_explorer.table_info(db, schema_cache.get_table(table_name))
 
 @app.get("/admin/db/tables/{table_name}", response_model=list[dict], dependencies=[Depends(auth.require_admin)])
-def get_table_content(table_name: str, db: Session = Depends(get_db)):
-    """Get the content of a specific table (limited to first 100 rows)."""
-    inspector = inspect(db.get_bind())
-    if table_name not in inspector.get_table_names():
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    try:
-        # Using raw SQL for dynamic table querying
-        # Limit to 100 rows to prevent overwhelming the UI
-        query = text(f"SELECT * FROM {table_name} LIMIT 100")
-        result = db.execute(query)
-        
-        # Convert the result rows to a list of dictionaries
-        rows = result.fetchall()
-        if not rows:
-            return []
-        
-        # Get column names from the result
-        column_names = result.keys()
-        
-        # Convert rows to dictionaries
-        return [dict(zip(column_names, row)) for row in rows]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error querying table: {str(e)}")
\ No newline at end of file
+def get_table_content(
+    table_name: str,
+    response: Response,
+    filters: str | None = None,
+    sort: str | None = None,
+    cursor: str | None = None,
+    limit: int = db_explorer.DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db),
+):
+    """
+    Get a page of a table's rows.
+
+    filters is a JSON object of column equality filters (null matches NULL),
+    sort a column name, prefixed with "-" for descending order. The next
+    page's cursor is returned in the X-Next-Cursor header and the planner's
+    estimate of the table's row count in X-Estimated-Count.
+    """
+    table = schema_cache.get_table(table_name)
+    rows, next_cursor = db_explorer.fetch_rows(
+        db, table, parse_json_filter("filters", filters), sort, cursor, limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    estimate = db_explorer.estimated_row_count(db, table_name)
+    if estimate is not None:
+        response.headers["X-Estimated-Count"] = str(estimate)
+    # Serialized directly instead of through jsonable_encoder
+    return FastJSONResponse(rows, headers=dict(response.headers))
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+In-process Metrics
+
+Lightweight counters and histograms shared by the backend modules and
+exposed through the admin metrics endpoint. Values are per worker process.
+"""
+
+import threading
+
+
+class Counter:
+    """A monotonically increasing count."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+class Histogram:
+    """Counts observations into cumulative buckets (upper bounds, in seconds)."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = sorted(buckets)
+        self._counts = [0] * len(self._buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound:g}": count for bound, count in zip(self._buckets, self._counts)}
+            buckets["le_inf"] = self._count
+            return {"count": self._count, "sum": round(self._sum, 6), "buckets": buckets}
+
+
+# Default buckets for latencies, from 1ms to 30s
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+_counters: dict[str, Counter] = {}
+_histograms: dict[str, Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str) -> Counter:
+    """Get or create the counter registered under name."""
+    with _registry_lock:
+        return _counters.setdefault(name, Counter())
+
+
+def histogram(name: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    """Get or create the histogram registered under name."""
+    with _registry_lock:
+        return _histograms.setdefault(name, Histogram(buckets))
+
+
+def snapshot() -> dict:
+    """Current value of every registered metric."""
+    with _registry_lock:
+        counters = dict(_counters)
+        histograms = dict(_histograms)
+    return {
+        "counters": {name: metric.value for name, metric in sorted(counters.items())},
+        "histograms": {name: metric.snapshot() for name, metric in sorted(histograms.items())},
+    }
@@ -0,0 +1,79 @@
+"""
+Schema Migrations
+
+create_all() only creates missing tables, so changes to tables that
+already exist (new indexes, backfills, ...) are applied here. Each
+migration runs once and is recorded in the schema_migrations table.
+Migrations run at startup right after create_all(), and can also be
+applied by hand with `python migrations.py`.
+"""
+
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+import etag
+import mailbox_access
+import models
+import rollups
+from database import engine
+
+# Arbitrary key for the advisory lock that keeps concurrent workers from migrating at once
+MIGRATION_LOCK_ID = 7_260_001
+
+
+def create_indexes(*names: str) -> Callable[[Connection], None]:
+    """Migration step creating indexes declared on the models, if they are missing."""
+    def apply(connection: Connection):
+        indexes = {index.name: index for table in models.Base.metadata.tables.values() for index in table.indexes}
+        for name in names:
+            indexes[name].create(connection, checkfirst=True)
+    return apply
+
+
+# Ordered list of (version, step), never reorder or rename applied versions
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = [
+    ("0001_keyset_pagination_indexes", create_indexes("ix_requests_timestamp_id", "ix_audit_log_timestamp_id")),
+    ("0002_hot_path_indexes", create_indexes(
+        "ix_users_role",
+        "ix_requests_submitted_by_timestamp",
+        "ix_requests_status_timestamp",
+        "ix_requests_form_definition_id",
+        "ix_requests_form_data_gin",
+        "ix_audit_log_event_type_timestamp",
+        "ix_audit_log_actor_id",
+        "ix_audit_log_details_gin",
+    )),
+    # create_all() adds the empty table, fill it from the requests that already exist
+    ("0003_backfill_request_rollups", rollups.rebuild),
+    ("0004_table_version_triggers", etag.install_version_triggers),
+    # Split the full_access_users of mailboxes imported before mailbox_access existed
+    ("0005_backfill_mailbox_access", mailbox_access.rebuild),
+    ("0006_free_temp_accounts_index", create_indexes("ix_temp_accounts_free")),
+    ("0007_shard_table_versions", etag.shard_table_versions),
+]
+
+
+def run_migrations(bind: Engine = engine) -> list[str]:
+    """Apply pending migrations in a single transaction, returning the versions applied."""
+    applied_now = []
+    with bind.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+        for version, step in MIGRATIONS:
+            if version in applied:
+                continue
+            step(connection)
+            connection.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+            applied_now.append(version)
+    return applied_now
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+    print(f"Applied {len(applied)} migration(s): {', '.join(applied) or 'none'}")
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Boolean, Column, Integer, String, Enum as SQLAlchemyEnum, 
-    ForeignKey, DateTime, Text, Table
+    ForeignKey, DateTime, Date, Text, Table, Index, Sequence, BigInteger
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
@@ -16,6 +16,9 @@ manager_mailbox_association = Table(
     Column("mailbox_id", Integer, ForeignKey("shared_mailboxes.id"), primary_key=True),
 )
 
+# Sequence numbers of dashboard events, shared by all workers (see event_bus.py)
+dashboard_event_seq = Sequence("dashboard_event_seq", metadata=Base.metadata)
+
 class UserRole(str, enum.Enum):
     manager = "manager"
     admin = "admin"
@@ -32,7 +35,7 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
-    role = Column(SQLAlchemyEnum(UserRole))
+    role = Column(SQLAlchemyEnum(UserRole), index=True)  # "First admin/manager" lookups filter on role
     service = Column(String, index=True, nullable=True)  # Department/Service field
     
     # Relationship: managers can see specific shared mailboxes
@@ -89,6 +92,55 @@ class Request(Base):
     form_definition = relationship("FormDefinition", back_populates="requests")
     assigned_temp_account = relationship("TempAccount", back_populates="assigned_requests")
 
+    __table_args__ = (
+        # Keyset pagination key for listings ordered newest first
+        Index("ix_requests_timestamp_id", "timestamp", "id"),
+        # Manager listings: requests of the service's managers, newest first
+        Index("ix_requests_submitted_by_timestamp", "submitted_by_manager_id", "timestamp", "id"),
+        # Status breakdowns and status-filtered listings
+        Index("ix_requests_status_timestamp", "status", "timestamp"),
+        Index("ix_requests_form_definition_id", "form_definition_id"),
+        # Containment searches on the submitted answers (form_data @> '{...}')
+        Index("ix_requests_form_data_gin", "form_data", postgresql_using="gin", postgresql_ops={"form_data": "jsonb_path_ops"}),
+    )
+
+class RequestRollup(Base):
+    """Request counts per day, status, submitter service and form, maintained by rollups.py."""
+    __tablename__ = "request_rollups"
+
+    day = Column(Date, primary_key=True)
+    status = Column(SQLAlchemyEnum(RequestStatus), primary_key=True)
+    service = Column(String, primary_key=True)  # "" when the submitter has no service
+    form_definition_id = Column(Integer, primary_key=True)  # 0 when the request has no form
+    count = Column(Integer, nullable=False, default=0)
+
+class TableVersion(Base):
+    """Change counter per table, bumped by triggers and used to build ETags (see etag.py)."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)  # The version is the sum over a table's shards
+    version = Column(BigInteger, nullable=False, default=0)
+
+class ImportJobRecord(Base):
+    """Progress of a CSV import job, shared by every worker (see import_jobs.py)."""
+    __tablename__ = "import_jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    bytes_read = Column(BigInteger, nullable=False, default=0)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    added = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    errors = Column(JSONB, nullable=False, default=list)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
 class TempAccount(Base):
     __tablename__ = "temp_accounts"
 
@@ -100,6 +152,11 @@ class TempAccount(Base):
     # Relationships
     assigned_requests = relationship("Request", back_populates="assigned_temp_account")
 
+    __table_args__ = (
+        # Free accounts only, the allocator claims the lowest id from it (see crud.claim_temp_account)
+        Index("ix_temp_accounts_free", "id", postgresql_where=is_in_use.isnot(True)),
+    )
+
 class SharedMailbox(Base):
     __tablename__ = "shared_mailboxes"
 
@@ -124,6 +181,18 @@ class SharedMailbox(Base):
         overlaps="visible_mailboxes,visible_to_managers"
     )
 
+class MailboxAccess(Base):
+    """One row per user listed in a shared mailbox's FullAccess column (see mailbox_access.py)."""
+    __tablename__ = "mailbox_access"
+
+    mailbox_id = Column(Integer, ForeignKey("shared_mailboxes.id", ondelete="CASCADE"), primary_key=True)
+    user_email = Column(String, primary_key=True)  # Lowercased
+
+    __table_args__ = (
+        # Reverse lookups: the mailboxes a user has access to
+        Index("ix_mailbox_access_user_email", "user_email"),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
 
@@ -136,6 +205,15 @@ class AuditLog(Base):
     # Relationships
     actor = relationship("User", foreign_keys=[actor_id])
 
+    __table_args__ = (
+        # Keyset pagination key for listings ordered newest first
+        Index("ix_audit_log_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_log_event_type_timestamp", "event_type", "timestamp"),
+        Index("ix_audit_log_actor_id", "actor_id"),
+        # Containment searches on event details (details @> '{...}')
+        Index("ix_audit_log_details_gin", "details", postgresql_using="gin", postgresql_ops={"details": "jsonb_path_ops"}),
+    )
+
 class WalkthroughTemplate(Base):
     __tablename__ = "walkthrough_templates"
 
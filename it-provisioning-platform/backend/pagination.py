@@ -0,0 +1,95 @@
+"""
+Keyset (Cursor) Pagination
+
+Lists ordered newest first on (timestamp, id) are paged by remembering the
+key of the last row seen instead of an OFFSET, so deep pages cost the same
+as the first one. Cursors are opaque to clients: a url-safe base64 string
+holding the key and the direction to page in.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+
+@dataclass
+class Cursor:
+    timestamp: datetime
+    id: int
+    direction: str = "next"  # "next" pages to older rows, "prev" to newer rows
+
+
+def encode_cursor(timestamp: datetime, id: int, direction: str = "next") -> str:
+    payload = json.dumps([timestamp.isoformat(), id, direction]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return Cursor(timestamp=datetime.fromisoformat(timestamp), id=int(id), direction=direction)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+    def set_headers(self, response: Response):
+        """Expose the cursors to clients without changing the list response body."""
+        if self.next_cursor:
+            response.headers["X-Next-Cursor"] = self.next_cursor
+        if self.prev_cursor:
+            response.headers["X-Prev-Cursor"] = self.prev_cursor
+
+
+def keyset_page(query: Query, timestamp_column, id_column, cursor: Cursor | None, limit: int) -> Page:
+    """Fetch one page of query, newest first, starting after cursor."""
+    key = tuple_(timestamp_column, id_column)
+    if cursor and cursor.direction == "prev":
+        # Walk towards newer rows in ascending order, then flip back to newest first
+        query = query.filter(key > tuple_(cursor.timestamp, cursor.id))
+        query = query.order_by(timestamp_column.asc(), id_column.asc())
+    else:
+        if cursor:
+            query = query.filter(key < tuple_(cursor.timestamp, cursor.id))
+        query = query.order_by(timestamp_column.desc(), id_column.desc())
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if cursor and cursor.direction == "prev":
+        rows.reverse()
+
+    page = Page(items=rows)
+    if not rows:
+        return page
+    first, last = rows[0], rows[-1]
+    going_back = cursor is not None and cursor.direction == "prev"
+    if has_more or going_back:
+        page.next_cursor = encode_cursor(last.timestamp, last.id, "next")
+    if (has_more and going_back) or (cursor is not None and not going_back):
+        page.prev_cursor = encode_cursor(first.timestamp, first.id, "prev")
+    return page
+
+
+def offset_page(rows: list, skip: int, limit: int) -> Page:
+    """Wrap an OFFSET page, with cursors so clients can switch to keyset paging."""
+    page = Page(items=rows)
+    if rows and len(rows) == limit:
+        page.next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id, "next")
+    if rows and skip > 0:
+        page.prev_cursor = encode_cursor(rows[0].timestamp, rows[0].id, "prev")
+    return page
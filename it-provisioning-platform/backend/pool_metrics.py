@@ -0,0 +1,52 @@
+"""
+Connection Pool Instrumentation
+
+Queue pools that record how long each checkout waits for a connection and
+how often the pool limit times out, plus a helper reporting live pool
+state for the admin metrics endpoint.
+"""
+
+import time
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import metrics
+
+
+class _InstrumentedPoolMixin:
+    # Prefix of the metrics recorded for this pool, set by the concrete classes
+    metric_prefix = "db_pool"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            metrics.counter(f"{self.metric_prefix}_timeouts").inc()
+            raise
+        finally:
+            metrics.histogram(f"{self.metric_prefix}_wait_seconds").observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metric_prefix = "db_pool_sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metric_prefix = "db_pool_async"
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Live state of an engine's pool along with its checkout wait histogram."""
+    pool = engine.pool
+    prefix = getattr(pool, "metric_prefix", "db_pool")
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),  # Connections opened beyond pool_size
+        "timeouts": metrics.counter(f"{prefix}_timeouts").value,
+        "wait_seconds": metrics.histogram(f"{prefix}_wait_seconds").snapshot(),
+    }
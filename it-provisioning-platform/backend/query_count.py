@@ -0,0 +1,116 @@
+"""
+Per-request Query Counting
+
+Counts the SQL statements each HTTP request executes, on both engines, to
+catch N+1 loading before it reaches production:
+
+- Every response carries an X-Query-Count header and the count is recorded
+  in the db_queries_per_request histogram.
+- Requests are held to QUERY_BUDGET_DEFAULT statements, or to the budget an
+  endpoint declares with dependencies=[query_count.budget(n)]. Going over is
+  logged and counted in query_budget_exceeded.
+- With QUERY_BUDGET_STRICT=1 (development, CI) the statement that goes over
+  the budget raises QueryBudgetExceeded instead, failing the request with a
+  500 so regressions are caught by any test that calls the endpoint.
+"""
+
+import logging
+import os
+from contextvars import ContextVar
+
+from fastapi import Depends, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+import metrics
+
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "25"))
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "").lower() in ("1", "true", "yes")
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 250, 1000)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, count: int, budget: int):
+        super().__init__(f"Query budget exceeded: {count} queries, budget {budget}")
+        self.count = count
+        self.budget = budget
+
+
+class QueryCount:
+    def __init__(self, budget: int):
+        self.count = 0
+        self.budget = budget
+        self.finished = False  # Work still running after the response (background tasks) is not counted
+
+
+_current: ContextVar[QueryCount | None] = ContextVar("query_count", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is None or counter.finished:
+        return
+    counter.count += 1
+    if QUERY_BUDGET_STRICT and counter.count > counter.budget:
+        raise QueryBudgetExceeded(counter.count, counter.budget)
+
+
+def instrument(*engines: Engine):
+    """Count the statements executed by engines (pass async engines' sync_engine)."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def budget(limit: int):
+    """Dependency declaring an endpoint's query budget, e.g. dependencies=[query_count.budget(2)]."""
+    def set_budget():
+        counter = _current.get()
+        if counter is not None:
+            counter.budget = limit
+    return Depends(set_budget)
+
+
+async def budget_exceeded_handler(request: Request, exc: QueryBudgetExceeded):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+
+class QueryCountMiddleware:
+    """ASGI middleware counting each HTTP request's queries, see the module docstring."""
+
+    def __init__(self, app):
+        self.app = app
+        self._histogram = metrics.histogram("db_queries_per_request", QUERY_COUNT_BUCKETS)
+        self._exceeded = metrics.counter("query_budget_exceeded")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCount(QUERY_BUDGET_DEFAULT)
+        token = _current.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start" and not counter.finished:
+                # Streaming responses keep querying after this point, only what ran before is counted
+                counter.finished = True
+                MutableHeaders(scope=message)["X-Query-Count"] = str(counter.count)
+                self._histogram.observe(counter.count)
+                if counter.count > counter.budget:
+                    self._exceeded.inc()
+                    logger.warning(
+                        "%s %s ran %d queries, over its budget of %d",
+                        scope["method"], scope["path"], counter.count, counter.budget,
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            counter.finished = True
+            _current.reset(token)
@@ -0,0 +1,88 @@
+"""
+Request Rollups
+
+The analytics endpoints read request counts from the request_rollups table
+(one row per day, status, submitter service and form) instead of
+aggregating the whole requests table on every dashboard refresh.
+
+Rows are kept current incrementally in the same transaction that creates a
+request or changes its status, so a rollup never disagrees with a committed
+request. After a backfill or a manual data fix, recompute everything with
+`python rollups.py rebuild`.
+"""
+
+import sys
+
+from sqlalchemy import Date, cast, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+Rollup = models.RequestRollup
+
+KEY_COLUMNS = ["day", "status", "service", "form_definition_id"]
+
+# Rollup key of a request, computed from the row itself so callers need not load the submitter
+_day = cast(models.Request.timestamp, Date)
+_service = func.coalesce(models.User.service, "")
+_form_definition_id = func.coalesce(models.Request.form_definition_id, 0)
+_requests = models.Request.__table__.outerjoin(
+    models.User.__table__, models.Request.submitted_by_manager_id == models.User.id
+)
+
+
+def _add(db: Session, request_id: int, status: models.RequestStatus, delta: int):
+    """Add delta to the count of the rollup row request_id falls into under status."""
+    source = (
+        select(_day, literal(status, Rollup.status.type), _service, _form_definition_id, literal(delta))
+        .select_from(_requests)
+        .where(models.Request.id == request_id)
+    )
+    stmt = insert(Rollup).from_select(KEY_COLUMNS + ["count"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={"count": Rollup.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def record_created(db: Session, request: models.Request):
+    """Count a new request, which must already be flushed so it has an id and timestamp."""
+    _add(db, request.id, request.status or models.RequestStatus.pending, 1)
+
+
+def record_status_change(db: Session, request_id: int, from_status: models.RequestStatus, to_status: models.RequestStatus):
+    if from_status == to_status:
+        return
+    # Touch the two rows in a fixed order, concurrent changes in opposite directions would deadlock otherwise
+    for status, delta in sorted([(from_status, -1), (to_status, 1)], key=lambda change: change[0].value):
+        _add(db, request_id, status, delta)
+
+
+def rebuild(db) -> int:
+    """Recompute every rollup row from the requests table, returning the number of rows written.
+
+    Accepts a Session or a Connection, the caller commits.
+    """
+    # Writers wait for the rebuild instead of bumping rows that are about to be replaced
+    db.execute(text(f"LOCK TABLE {Rollup.__tablename__} IN EXCLUSIVE MODE"))
+    db.execute(delete(Rollup))
+    source = (
+        select(_day, models.Request.status, _service, _form_definition_id, func.count())
+        .select_from(_requests)
+        .where(models.Request.status.isnot(None))
+        .group_by(_day, models.Request.status, _service, _form_definition_id)
+    )
+    result = db.execute(insert(Rollup).from_select(KEY_COLUMNS + ["count"], source))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("Usage: python rollups.py rebuild")
+    with SessionLocal() as db:
+        rows = rebuild(db)
+        db.commit()
+    print(f"Rebuilt {rows} rollup row(s)")
@@ -0,0 +1,76 @@
+"""
+Schema Reflection Cache
+
+A snapshot of every table in the database (names, columns, types, primary
+keys), reflected in one pass at startup so the database explorer and table
+exports answer metadata questions without querying the system catalog.
+
+The snapshot is reloaded when it is older than SCHEMA_CACHE_TTL_SECONDS
+(0 keeps it until refreshed) or on demand through refresh(), e.g. after a
+migration adds a table while the server is running.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import MetaData, Table
+
+import metrics
+from database import engine
+
+SCHEMA_CACHE_TTL_SECONDS = int(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "300"))
+
+
+class SchemaCache:
+    def __init__(self, bind=engine, ttl_seconds: int = SCHEMA_CACHE_TTL_SECONDS):
+        self._bind = bind
+        self._ttl = ttl_seconds
+        self._metadata: MetaData | None = None
+        self._loaded_at = 0.0
+        self._loaded_at_utc: datetime | None = None
+        self._lock = threading.Lock()
+        self._refreshes = metrics.counter("schema_cache_refreshes")
+
+    def refresh(self) -> MetaData:
+        """Reflect every table again and replace the snapshot."""
+        metadata = MetaData()
+        metadata.reflect(bind=self._bind)
+        with self._lock:
+            self._metadata = metadata
+            self._loaded_at = time.monotonic()
+            self._loaded_at_utc = datetime.now(timezone.utc)
+        self._refreshes.inc()
+        return metadata
+
+    def _snapshot(self) -> MetaData:
+        with self._lock:
+            metadata = self._metadata
+            expired = self._ttl > 0 and time.monotonic() - self._loaded_at > self._ttl
+        if metadata is None or expired:
+            metadata = self.refresh()
+        return metadata
+
+    def table_names(self) -> list[str]:
+        return list(self._snapshot().tables)
+
+    def get_table(self, table_name: str) -> Table:
+        """Reflected table, raises 404 for tables that do not exist."""
+        table = self._snapshot().tables.get(table_name)
+        if table is None:
+            raise HTTPException(status_code=404, detail="Table not found")
+        return table
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tables": len(self._metadata.tables) if self._metadata is not None else 0,
+                "loaded_at": self._loaded_at_utc.isoformat() if self._loaded_at_utc else None,
+                "ttl_seconds": self._ttl,
+            }
+
+
+# Global schema cache instance
+schema_cache = SchemaCache()
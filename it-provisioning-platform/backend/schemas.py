@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Any
+from typing import Any, Literal
 from datetime import datetime
 from models import UserRole
 
@@ -70,6 +70,27 @@ class Request(RequestBase):
     class Config:
         from_attributes = True
 
+# List view of a request: scalar columns and small related fields, without
+# form_data, the walkthrough state or the form schema
+class UserSummary(BaseModel):
+    id: int
+    full_name: str | None = None
+    email: str | None = None
+    service: str | None = None
+
+class FormDefinitionSummary(BaseModel):
+    id: int
+    name: str
+
+class RequestSummary(BaseModel):
+    id: int
+    status: str
+    timestamp: datetime | None = None
+    form_definition_id: int | None = None
+    submitted_by: UserSummary | None = None
+    form_definition: FormDefinitionSummary | None = None
+    assigned_temp_account: TempAccount | None = None
+
 class SharedMailboxBase(BaseModel):
     display_name: str
     primary_smtp_address: str
@@ -84,6 +105,25 @@ class SharedMailbox(SharedMailboxBase):
     class Config:
         from_attributes = True
 
+# Mailbox permission batch schemas
+class MailboxPermission(BaseModel):
+    manager_id: int
+    mailbox_id: int
+
+class ManagerMailboxes(BaseModel):
+    manager_id: int
+    mailbox_ids: list[int]
+
+class MailboxPermissionBatch(BaseModel):
+    grant: list[MailboxPermission] = []
+    revoke: list[MailboxPermission] = []
+    # Desired state: each listed manager ends up seeing exactly these mailboxes
+    replace: list[ManagerMailboxes] = []
+
+class MailboxPermissionResult(MailboxPermission):
+    action: Literal["grant", "revoke"]
+    status: Literal["granted", "already_granted", "revoked", "not_granted", "unknown_manager", "unknown_mailbox"]
+
 class AuditLog(BaseModel):
     id: int
     timestamp: datetime
@@ -0,0 +1,61 @@
+"""
+Test fixtures.
+
+The tests run against a real Postgres database given by TEST_DATABASE_URL and
+are not collected without one. The database is wiped (its public schema dropped)
+when the session starts, so point it at a throwaway database.
+
+Imports run inline so a job has finished when its upload returns, and the
+query budgets are strict so going over one fails the request.
+"""
+
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+if not TEST_DATABASE_URL:
+    collect_ignore_glob = ["test_*.py"]
+else:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["DATABASE_MODE"] = "sync"
+    os.environ["IMPORT_JOB_BACKEND"] = "inline"
+    os.environ["QUERY_BUDGET_STRICT"] = "1"
+
+    from sqlalchemy import create_engine, text
+
+    with create_engine(TEST_DATABASE_URL).begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    from audit import audit_sink
+    from identity_cache import identity_cache
+    import models
+    from database import engine
+    from sqlalchemy import text
+
+    audit_sink.flush()  # Buffered events of this test would otherwise land after the truncate
+    tables = ", ".join(f'"{table.name}"' for table in models.Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    identity_cache.invalidate_all()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
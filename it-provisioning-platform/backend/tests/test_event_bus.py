@@ -0,0 +1,134 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+import event_bus
+from event_bus import EventBus, InMemoryEventBus
+
+
+def deliver(bus: EventBus, *seqs: int):
+    for seq in seqs:
+        bus._deliver(seq, {"type": "status_update", "data": {"id": seq}})
+
+
+def replayed(bus: EventBus, seq: int) -> list[int] | None:
+    missed = bus.since(seq)
+    return None if missed is None else [entry_seq for entry_seq, _ in missed]
+
+
+def test_since_returns_later_events():
+    bus = InMemoryEventBus()
+    deliver(bus, 1, 2, 3)
+    assert replayed(bus, 1) == [2, 3]
+    assert replayed(bus, 3) == []
+    assert replayed(bus, 4) is None
+
+
+def test_late_event_is_replayed_to_clients_that_saw_a_higher_one():
+    bus = InMemoryEventBus()
+    # 3 was published before 4 but committed after it
+    deliver(bus, 1, 2, 4, 3, 5)
+    assert [seq for seq, _, _ in bus._replay] == [1, 2, 3, 4, 5]
+    assert bus.last_seq == 5
+    assert replayed(bus, 4) == [3, 5]
+    assert replayed(bus, 2) == [3, 4, 5]
+    assert replayed(bus, 5) == []
+
+
+def test_skipped_numbers_do_not_force_a_resync():
+    bus = InMemoryEventBus()
+    # 2 rolled back and never arrives
+    deliver(bus, 1, 3, 4)
+    assert replayed(bus, 1) == [3, 4]
+
+
+def test_evicted_events_force_a_resync():
+    bus = InMemoryEventBus(replay_size=3)
+    deliver(bus, 1, 2, 3, 4, 5)
+    assert replayed(bus, 1) is None
+    assert replayed(bus, 2) == [3, 4, 5]
+
+
+def test_evicted_late_event_forces_a_resync_for_clients_that_may_have_missed_it():
+    bus = InMemoryEventBus(replay_size=3)
+    deliver(bus, 1, 3, 2, 4, 5)
+    # 2 arrived after 3 and is gone, a client that saw 3 may never have received it
+    assert replayed(bus, 3) is None
+    assert replayed(bus, 4) == [5]
+
+
+def test_reset_forces_a_resync_and_notifies():
+    bus = InMemoryEventBus()
+    resets = []
+    bus._reset_handler = lambda: resets.append(bus.last_seq)
+    deliver(bus, 1, 2)
+    bus._reset()
+    assert resets == [2]
+    assert replayed(bus, 2) is None
+    deliver(bus, 6)
+    assert replayed(bus, 2) is None
+    assert replayed(bus, 6) == []
+
+
+def test_bus_without_publish_cannot_be_created():
+    class Incomplete(EventBus):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+class FakeConnection:
+    """Stands in for an asyncpg connection, add_listener raises when fail is set."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.closed = False
+        self.terminate_listeners = []
+
+    def add_termination_listener(self, callback):
+        self.terminate_listeners.append(callback)
+
+    async def add_listener(self, channel, callback):
+        if self.fail:
+            raise asyncpg.InterfaceError("connection was closed in the middle of operation")
+
+    def drop(self):
+        for callback in self.terminate_listeners:
+            callback(self)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+
+def test_listener_reconnects_and_resets_after_any_failure(monkeypatch):
+    connections = [FakeConnection(fail=True), FakeConnection(), FakeConnection(fail=True), FakeConnection()]
+    attempts = iter(connections)
+
+    async def connect(dsn):
+        return next(attempts)
+
+    monkeypatch.setattr(event_bus.asyncpg, "connect", connect)
+    monkeypatch.setattr(event_bus, "RECONNECT_DELAY_SECONDS", 0)
+
+    async def scenario():
+        bus = event_bus.PostgresEventBus()
+        resets = []
+        # The first connection fails before listening, start() still completes on the second
+        await bus.start(lambda seq, event: None, lambda: resets.append(True))
+        assert resets == []
+
+        # The next reconnect fails too, the one after it listens again and resets
+        connections[1].drop()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert resets == [True]
+        assert all(connection.closed for connection in connections[:3])
+        assert not bus._listener_task.done()
+        await bus.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+import functools
+import io
+
+import bulk_import
+import import_jobs
+import models
+
+
+def temp_accounts_csv(count: int, missing_name_every: int = 0) -> bytes:
+    lines = ["userPrincipalName,displayName"]
+    for i in range(count):
+        name = "" if missing_name_every and i % missing_name_every == 0 else f"Temp {i}"
+        lines.append(f"temp{i}@example.com,{name}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_upload_runs_job_inline(client, db):
+    response = client.post(
+        "/admin/upload-temp-accounts-csv",
+        files={"file": ("temp_accounts.csv", temp_accounts_csv(10), "text/csv")},
+    )
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == "completed"
+
+    job = client.get(f"/admin/jobs/{body['job_id']}").json()
+    assert job["status"] == "completed"
+    assert job["rows_processed"] == 10
+    assert job["added"] == 10
+    assert job["bytes_read"] == job["total_bytes"]
+    assert db.query(models.TempAccount).count() == 10
+
+
+def test_job_state_is_shared_between_queues():
+    # Two queues stand in for two workers: progress written by one is read by the other
+    worker = import_jobs.ImportJobQueue(import_jobs.InProcessBackend())
+    poller = import_jobs.ImportJobQueue(import_jobs.InProcessBackend())
+
+    csv = temp_accounts_csv(25, missing_name_every=5)
+    job = worker.submit(bulk_import.TEMP_ACCOUNTS, "temp_accounts", "temp.csv", io.BytesIO(csv))
+
+    polled = poller.get(job.id)
+    assert polled.status == import_jobs.JobStatus.completed
+    assert (polled.added, polled.skipped) == (20, 5)
+    assert polled.total_bytes == len(csv)
+    assert polled.finished_at >= polled.started_at >= polled.created_at
+    assert [recent.id for recent in poller.recent()] == [job.id]
+
+
+def test_progress_is_saved_once_per_chunk(monkeypatch):
+    queue = import_jobs.ImportJobQueue(import_jobs.InProcessBackend())
+    saved = []
+    save = queue._save
+    monkeypatch.setattr(queue, "_save", lambda job: (saved.append(job.rows_processed), save(job)))
+    monkeypatch.setattr(bulk_import, "run_import", functools.partial(bulk_import.run_import, chunk_size=10))
+
+    queue.submit(bulk_import.TEMP_ACCOUNTS, "temp_accounts", "temp.csv", io.BytesIO(temp_accounts_csv(25)))
+
+    # Queued, started, three chunks and finished
+    assert saved == [0, 0, 10, 20, 25, 25]
+
+
+def test_failed_job_records_error(client):
+    response = client.post(
+        "/admin/upload-temp-accounts-csv",
+        files={"file": ("temp_accounts.csv", b"userPrincipalName\n\xff\xfe\n", "text/csv")},
+    )
+    job = client.get(f"/admin/jobs/{response.json()['job_id']}").json()
+    assert job["status"] == "failed"
+    assert job["message"].startswith("Import failed:")
+    assert job["errors"]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/admin/jobs/missing").status_code == 404
@@ -0,0 +1,102 @@
+"""
+Query budgets, run with QUERY_BUDGET_STRICT on (see conftest.py): going over
+a budget fails the request with a 500, and the counts must not grow with the
+amount of data.
+"""
+
+import pytest
+from sqlalchemy import insert
+
+import models
+import query_count
+
+ADMIN = {"user-id": "1"}
+MANAGER = {"user-id": "2"}
+
+
+def seed(db, managers: int, mailboxes_per_manager: int = 5, requests_per_manager: int = 3):
+    """An admin (id 1) and managers (ids 2..) each seeing their own mailboxes and submitting requests."""
+    db.execute(insert(models.User), [{"full_name": "Admin", "email": "admin@example.com", "role": models.UserRole.admin}] + [
+        {"full_name": f"Manager {i}", "email": f"manager{i}@example.com", "role": models.UserRole.manager, "service": f"Service {i % 3}"}
+        for i in range(managers)
+    ])
+    db.execute(insert(models.FormDefinition), [{"name": "Form", "schema": {"fields": []}, "created_by_admin_id": 1}])
+    db.execute(insert(models.SharedMailbox), [
+        {"display_name": f"Mailbox {i}", "primary_smtp_address": f"mailbox{i}@example.com"}
+        for i in range(managers * mailboxes_per_manager)
+    ])
+    db.execute(insert(models.manager_mailbox_association), [
+        {"manager_id": manager + 2, "mailbox_id": manager * mailboxes_per_manager + i + 1}
+        for manager in range(managers)
+        for i in range(mailboxes_per_manager)
+    ])
+    db.execute(insert(models.Request), [
+        {"form_definition_id": 1, "submitted_by_manager_id": manager + 2, "form_data": {"n": i}, "status": models.RequestStatus.pending}
+        for manager in range(managers)
+        for i in range(requests_per_manager)
+    ])
+    db.commit()
+
+
+def query_count_of(response) -> int:
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Query-Count"])
+
+
+@pytest.mark.parametrize("managers", [1, 20, 100])
+def test_permissions_matrix_stays_within_budget(client, db, managers):
+    seed(db, managers)
+    response = client.get("/admin/permissions/manager-mailboxes", params={"limit": 100}, headers=ADMIN)
+
+    assert query_count_of(response) <= 2
+    matrix = response.json()
+    assert len(matrix) == managers
+    assert all(len(entry["visible_mailboxes"]) == 5 for entry in matrix)
+
+
+def test_permissions_matrix_filters_stay_within_budget(client, db):
+    seed(db, 30)
+    for params in ({"manager": "Manager 1"}, {"mailbox": "Mailbox 4"}, {"skip": 10, "limit": 5}):
+        assert query_count_of(client.get("/admin/permissions/manager-mailboxes", params=params, headers=ADMIN)) <= 2
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/requests/", {}),
+    ("/requests/?view=summary", {}),
+    ("/requests/", MANAGER),
+    ("/manager/shared-mailboxes", MANAGER),
+    ("/admin/audit-log", ADMIN),
+    ("/shared-mailboxes", {}),
+])
+def test_listings_do_not_grow_with_rows(client, db, path, headers):
+    seed(db, 60)
+    client.get(path, headers=headers)  # Warm the identity cache, its first lookup costs a query
+    counts = {query_count_of(client.get(path, params={"limit": limit}, headers=headers)) for limit in (1, 100)}
+    assert len(counts) == 1 and counts.pop() <= query_count.QUERY_BUDGET_DEFAULT
+
+
+@pytest.mark.parametrize("pairs", [1, 200])
+def test_batch_permissions_stay_within_budget(client, db, pairs):
+    seed(db, 50)
+    grants = [{"manager_id": 2 + i % 50, "mailbox_id": 1 + i} for i in range(pairs)]
+    response = client.post("/admin/permissions/mailbox-to-manager/batch", json={"grant": grants}, headers=ADMIN)
+    assert query_count_of(response) <= query_count.QUERY_BUDGET_DEFAULT
+
+
+@pytest.mark.parametrize("mailboxes", [1, 5])
+def test_mailbox_modifications_stay_within_budget(client, db, mailboxes):
+    seed(db, 2)
+    modifications = [
+        {"mailbox_id": mailbox_id, "mailbox_name": f"Mailbox {mailbox_id}", "add_users": ["someone@example.com"], "remove_users": []}
+        for mailbox_id in range(1, mailboxes + 1)
+    ]
+    response = client.post("/requests/mailbox-modifications", json={"modifications": modifications}, headers=MANAGER)
+    assert query_count_of(response) <= query_count.QUERY_BUDGET_DEFAULT
+
+
+def test_going_over_budget_fails_in_strict_mode(client, db, monkeypatch):
+    seed(db, 5)
+    monkeypatch.setattr(query_count, "QUERY_BUDGET_DEFAULT", 1)
+    response = client.get("/requests/")
+    assert response.status_code == 500
+    assert response.json()["detail"].startswith("Query budget exceeded")
@@ -0,0 +1,38 @@
+import models
+
+
+def create_request(client) -> dict:
+    client.post("/users/", json={"full_name": "Admin", "email": "admin@example.com", "role": "admin"})
+    client.post("/users/", json={"full_name": "Manager", "email": "manager@example.com", "role": "manager", "service": "IT"})
+    form = client.post("/form-definitions/", json={"name": "Form", "schema": {"fields": [{"name": "a"}]}}).json()
+    return client.post("/requests/", json={"form_definition_id": form["id"], "form_data": {"a": 1}}).json()
+
+
+def test_detail_summary_matches_list_row(client):
+    request = create_request(client)
+
+    summary = client.get(f"/requests/{request['id']}", params={"view": "summary"}).json()
+    assert summary == client.get("/requests/", params={"view": "summary"}).json()[0]
+    assert summary["form_definition"] == {"id": request["form_definition_id"], "name": "Form"}
+    assert "form_data" not in summary
+
+
+def test_detail_summary_of_unknown_request_is_404(client):
+    assert client.get("/requests/999", params={"view": "summary"}).status_code == 404
+
+
+def test_assigning_a_second_temp_account_is_rejected(client, db):
+    request = create_request(client)
+    db.add_all([
+        models.TempAccount(user_principal_name=f"temp{i}@example.com", display_name=f"Temp {i}", is_in_use=False)
+        for i in (1, 2)
+    ])
+    db.commit()
+
+    assert client.post(f"/requests/{request['id']}/assign-temp-account", json={"temp_account_id": 1}).status_code == 200
+    response = client.post(f"/requests/{request['id']}/assign-temp-account", json={"temp_account_id": 2})
+
+    assert response.status_code == 400
+    db.expire_all()
+    assert db.get(models.TempAccount, 2).is_in_use is False
+    assert db.get(models.Request, request["id"]).assigned_temp_account_id == 1
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import models
+import rollups
+from main import app
+
+STATUSES = ["pending", "in_progress", "completed", "rejected"]
+
+
+def rollup_counts(db) -> dict:
+    rows = db.execute(select(models.RequestRollup.status, models.RequestRollup.count)).all()
+    return {status.value: count for status, count in rows if count}
+
+
+def test_concurrent_status_changes_keep_rollups_consistent(client, db):
+    client.post("/users/", json={"full_name": "Admin", "email": "admin@example.com", "role": "admin"})
+    client.post("/users/", json={"full_name": "Manager", "email": "manager@example.com", "role": "manager", "service": "IT"})
+    form = client.post("/form-definitions/", json={"name": "Form", "schema": {"fields": []}}).json()
+    request_ids = [
+        client.post("/requests/", json={"form_definition_id": form["id"], "form_data": {}}).json()["id"]
+        for _ in range(3)
+    ]
+
+    def change_statuses(worker: int):
+        worker_client = TestClient(app)
+        for i in range(20):
+            request_id = request_ids[(worker + i) % len(request_ids)]
+            status = STATUSES[(worker * 7 + i) % len(STATUSES)]
+            assert worker_client.put(f"/requests/{request_id}/status", params={"status": status}).status_code == 200
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(change_statuses, range(8)))
+
+    incremental = rollup_counts(db)
+    assert sum(incremental.values()) == len(request_ids)
+
+    rollups.rebuild(db)
+    assert rollup_counts(db) == incremental
+    db.rollback()
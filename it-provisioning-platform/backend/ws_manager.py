@@ -2,47 +2,257 @@
 WebSocket Connection Manager for Real-Time Admin Dashboard
 
 This module handles WebSocket connections for the admin dashboard,
-allowing real-time updates when new requests are submitted or 
+allowing real-time updates when new requests are submitted or
 request statuses are changed.
+
+Each broadcast is serialized once and put on a bounded queue per client.
+A sender task per client drains its queue, so a slow browser only delays
+its own updates. When a client's queue is full, WS_DROP_POLICY decides
+what happens:
+
+- drop_oldest: discard the oldest queued message to make room (default)
+- drop_newest: discard the message being broadcast
+- disconnect: close the lagging client, it reconnects and reloads
+
+Clients whose sends fail or time out are reaped.
+
+Broadcasts go through the event bus (event_bus.py) so they reach the
+dashboards connected to every worker. Each message carries the event's
+sequence number; a client reconnecting with last_seq gets the events it
+missed, or a "resync" message when it has to reload. Connected clients also
+get a "resync" when the bus may have lost events.
+
+Clients subscribe to topics and only receive matching events:
+
+- service:<name>: requests submitted by that service's managers
+- request:<id>: a single request
+- event:<type>: one event type (new_request, status_update)
+
+A client without topics receives everything. A client connected as a
+manager with a service only ever receives that service's events, as in
+the request listing. Events carry the changed fields only, clients fetch
+the full request from the API when they need it.
 """
 
+import asyncio
+import json
+import logging
+import os
+
 from fastapi import WebSocket
 
+import metrics
+from event_bus import EventBus, create_event_bus
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+WS_DROP_POLICY = os.getenv("WS_DROP_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+TOPIC_KINDS = ("service", "request", "event")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_topics(topics: str | None) -> set[str] | None:
+    """Parse a comma-separated topic list, None (everything) when it is empty."""
+    parsed = {topic.strip() for topic in (topics or "").split(",") if topic.strip()}
+    for topic in parsed:
+        kind, _, value = topic.partition(":")
+        if kind not in TOPIC_KINDS or not value:
+            raise ValueError(f"Invalid topic {topic!r}, expected one of {', '.join(k + ':<value>' for k in TOPIC_KINDS)}")
+    return parsed or None
+
+
+def event_topics(event: dict) -> set[str]:
+    """Topics an event is published under."""
+    topics = {f"event:{event['type']}"}
+    data = event.get("data") or {}
+    if data.get("id") is not None:
+        topics.add(f"request:{data['id']}")
+    if event.get("service"):
+        topics.add(f"service:{event['service']}")
+    return topics
+
+
+class Client:
+    """A connected WebSocket with its outgoing queue, sender task and subscription."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, topics: set[str] | None = None, service: str | None = None):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.sender: asyncio.Task | None = None
+        self.dropped = 0
+        self.topics = topics
+        self.service = service  # Restricts the client to this service's events
+
+    def wants(self, event: dict, topics: set[str]) -> bool:
+        if self.service is not None and event.get("service") != self.service:
+            return False
+        return self.topics is None or not self.topics.isdisjoint(topics)
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates."""
-    
-    def __init__(self):
-        """Initialize the connection manager with an empty connections list."""
-        self.active_connections: list[WebSocket] = []
 
-    async def connect(self, websocket: WebSocket):
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        drop_policy: str = WS_DROP_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT_SECONDS,
+        bus: EventBus | None = None,
+    ):
+        """Initialize the connection manager with no connections."""
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown WebSocket drop policy {drop_policy!r}, expected one of {DROP_POLICIES}")
+        self.active_connections: dict[WebSocket, Client] = {}
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.send_timeout = send_timeout
+        self.bus = bus or create_event_bus()
+        self._closing: set[asyncio.Task] = set()  # Keeps close tasks referenced until they finish
+
+    async def start(self):
+        """Start receiving events from the bus, called on application startup."""
+        await self.bus.start(self._fan_out, self._resync_all)
+
+    async def stop(self):
+        await self.close_all()
+        await self.bus.stop()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        last_seq: int | None = None,
+        topics: set[str] | None = None,
+        service: str | None = None,
+    ):
         """
-        Accept a new WebSocket connection and add it to active connections.
-        
+        Accept a new WebSocket connection and start its sender task.
+
         Args:
             websocket: The WebSocket connection to accept
+            last_seq: Highest sequence number the client saw, to resume after a reconnect
+            topics: Topics to receive, None for every topic
+            service: Only send events of this service, whatever the topics
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = Client(websocket, self.queue_size, topics, service)
+        # No await from here on, so no event is fanned out between the replay and registering the client
+        if last_seq is not None:
+            missed = self.bus.since(last_seq)
+            if missed is not None:
+                missed = [(seq, event) for seq, event in missed if client.wants(event, event_topics(event))]
+            if missed is None or len(missed) > self.queue_size:
+                client.queue.put_nowait(json.dumps({"type": "resync", "seq": self.bus.last_seq}))
+            else:
+                for seq, event in missed:
+                    client.queue.put_nowait(self._serialize(seq, event))
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self.active_connections[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
         """
-        Remove a WebSocket connection from active connections.
-        
+        Remove a WebSocket connection and stop its sender task.
+
+        Safe to call more than once for the same connection.
+
         Args:
             websocket: The WebSocket connection to remove
         """
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client and client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
 
     async def broadcast(self, data: dict):
         """
-        Broadcast data to all active WebSocket connections.
-        
+        Publish data to the WebSocket connections of every worker without waiting for the sends.
+
         Args:
             data: Dictionary containing the data to broadcast
         """
-        for connection in self.active_connections:
-            await connection.send_json(data)
+        await self.bus.publish(data)
+
+    async def close_all(self):
+        """Close every connection, used when the worker shuts down."""
+        for websocket in list(self.active_connections):
+            self.disconnect(websocket)
+            await self._close(websocket)
+
+    def stats(self) -> dict:
+        """Current connections and the deepest client queue."""
+        clients = list(self.active_connections.values())
+        return {
+            "connections": len(clients),
+            "max_queue_depth": max((client.queue.qsize() for client in clients), default=0),
+            "drop_policy": self.drop_policy,
+            "last_seq": self.bus.last_seq,
+        }
+
+    @staticmethod
+    def _serialize(seq: int, event: dict) -> str:
+        # The service only routes the event, it is not sent
+        return json.dumps({"type": event["type"], "data": event.get("data"), "seq": seq}, default=str)
+
+    def _fan_out(self, seq: int, event: dict):
+        topics = event_topics(event)
+        message = None
+        for client in list(self.active_connections.values()):
+            if not client.wants(event, topics):
+                continue
+            # Serialized once, shared by every subscribed client queue
+            message = message or self._serialize(seq, event)
+            self._enqueue(client, message)
+
+    def _resync_all(self):
+        message = json.dumps({"type": "resync", "seq": self.bus.last_seq})
+        for client in list(self.active_connections.values()):
+            self._enqueue(client, message)
+
+    def _enqueue(self, client: Client, message: str):
+        try:
+            client.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        client.dropped += 1
+        metrics.counter("ws_messages_dropped").inc()
+        if self.drop_policy == "drop_oldest":
+            client.queue.get_nowait()
+            client.queue.put_nowait(message)
+        elif self.drop_policy == "disconnect":
+            self._reap(client, "send queue full")
+
+    async def _send_loop(self, client: Client):
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+                metrics.counter("ws_messages_sent").inc()
+                metrics.counter("ws_bytes_sent").inc(len(message))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Closed, broken or stalled socket
+            self._reap(client, repr(exc))
+
+    def _reap(self, client: Client, reason: str):
+        if self.active_connections.get(client.websocket) is not client:
+            return
+        logger.info("Dropping WebSocket client: %s", reason)
+        metrics.counter("ws_clients_reaped").inc()
+        self.disconnect(client.websocket)
+        # Closing ends the endpoint's receive loop as well
+        task = asyncio.create_task(self._close(client.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass  # Already closed
 
 # Global connection manager instance
 manager = ConnectionManager()
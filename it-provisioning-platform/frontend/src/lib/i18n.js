@@ -0,0 +1,9 @@
+import { register, init, getLocaleFromNavigator } from 'svelte-i18n';
+
+register('en', () => import('../locales/en.json'));
+register('fr', () => import('../locales/fr.json'));
+
+init({
+	fallbackLocale: 'en',
+	initialLocale: getLocaleFromNavigator(),
+});  
\ No newline at end of file
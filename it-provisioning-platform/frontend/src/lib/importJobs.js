@@ -0,0 +1,12 @@
+// Imports run as background jobs, poll until the job has finished
+export async function waitForJob(jobId, onProgress = () => {}) {
+	while (true) {
+		const response = await fetch(`/api/admin/jobs/${jobId}`);
+		const job = await response.json();
+		if (!response.ok) throw new Error(job.detail || 'Failed to fetch import progress');
+		if (job.status === 'completed') return job;
+		if (job.status === 'failed') throw new Error(job.message);
+		onProgress(job);
+		await new Promise((resolve) => setTimeout(resolve, 1000));
+	}
+}